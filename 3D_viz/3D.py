@@ -1,50 +1,52 @@
 import os
+import argparse
 import numpy as np
-from scipy.fft import fft
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-import matplotlib.colors
-import skimage.color as color
-
-# Visible light frequency range in THz (terahertz)
-visible_light_min = 430  # THz
-visible_light_max = 790  # THz
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from iq_reader import FORMATS, guess_format, iter_chunks, num_chunks
+from frame_geometry import get_geometry
+from fft_planner import plan_chunk_size
+from colorizer import get_colorizer
+from fft_engine import iter_spectra
+from point_cloud import PointCloud
 
 # Input frequency range in Hz (hertz)
 input_min = 0  # Hz
 input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
 
-# Calculate m and b for the linear transformation
-m = (visible_light_max - visible_light_min) / (input_max - input_min)
-b = visible_light_min - m * input_min
-
-def to_visible_light(input_frequency):
-    """Maps an input frequency to the visible light frequency range."""
-    return m * input_frequency + b
+# Frame layout: 'square' crops each spectrum to the largest square that
+# fits, 'rect' uses every bin in a nearly square rectangle
+frame_layout = 'square'
 
-def main():
-    # Load the RTL-SDR data from a file
-    iq_data = np.fromfile('input.bin', dtype=np.complex64)
+def main(input_file='input.bin', output_file='3d_plot.png', point_budget=200000, max_slices=200, fmt=None, remove_dc=False, autotune=False):
+    # Sample format of the capture
+    fmt = fmt or guess_format(input_file)
 
     # Chunk size (in number of samples)
     chunk_size = int(input_max * 0.5)
 
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection='3d')
-
-    for i in range(len(iq_data)//chunk_size):
-        # Select the current chunk
-        chunk = iq_data[i*chunk_size:(i+1)*chunk_size]
-
-        # Perform FFT to convert IQ data into frequency domain
-        fft_data = fft(chunk)
-        frequencies = np.fft.fftfreq(len(chunk)) * input_max
-
-        # Apply the transformation to each frequency
-        visible_light_frequencies = to_visible_light(np.abs(frequencies))
-
-        # Normalizing frequencies to 0-1 range for color mapping
-        normalized_frequencies = (visible_light_frequencies - np.min(visible_light_frequencies)) / np.ptp(visible_light_frequencies)
+    if autotune:
+        # Use the nearby chunk size with the fastest FFT that fills the frame
+        # exactly, benchmarked once on this host and kept in the wisdom file
+        chunk_size = plan_chunk_size(chunk_size, frame_layout)
+
+    # Use every step-th chunk as a time slice so long captures stay within max_slices
+    slices = num_chunks(input_file, chunk_size, fmt)
+    step = max(1, -(-slices // max_slices))
+    if slices:
+        cloud = PointCloud(point_budget, -(-slices // step))
+    else:
+        # The length of a pipe or FIFO is not known up front, so the cloud
+        # thins out its slices as they come to stay within both limits
+        cloud = PointCloud(point_budget, max_slices=max_slices)
+
+    # Stream the capture from disk and FFT it into the frequency domain,
+    # a batch of chunks at a time across all cores
+    chunks = (item for item in iter_chunks(input_file, chunk_size, fmt, step, remove_dc) if cloud.takes(item[0]))
+    for i, fft_data in iter_spectra(chunks, chunk_size):
+        # Look up the hue plane and frame size for this chunk length, which are
+        # computed once and shared by every frame
+        geometry = get_geometry(len(fft_data), input_max, frame_layout)
 
         # Compute the power spectral density (PSD) and normalize it for brightness adjustment
         psd = np.abs(fft_data) ** 2
@@ -55,44 +57,24 @@ def main():
         log_psd = np.log(psd + 1e-6)
         normalized_psd = (log_psd - np.min(log_psd)) / (np.max(log_psd) - np.min(log_psd))
 
-        # Combine frequency and PSD information
-        image_data = np.zeros((len(normalized_frequencies), 3))
-        image_data[:, 0] = normalized_frequencies  # Color (hue)
-        image_data[:, 1] = 1.0  # Saturation
-        image_data[:, 2] = normalized_psd  # Brightness
-
-        # Reshaping the frequency array into 2D format
-        size = int(np.sqrt(normalized_frequencies.shape[0]))
-        image_data = image_data[:size**2, :].reshape((size, size, 3))
-
-        # Convert HSV to RGB
-        rgb_image_data = matplotlib.colors.hsv_to_rgb(image_data)
-
-        # Convert to grayscale and then back to RGB for static
-        gray_image_data = color.rgb2gray(rgb_image_data)
-
-        # Reshape normalized_psd to match image_data dimensions
-        normalized_psd = normalized_psd[:size**2].reshape((size, size))
-
-        # Replace RGB image data with static data for low PSD values
-        gray_image_data[normalized_psd < 0.6] = 0  # zero out the grayscale values where psd is low
-
-        # create a grid for x and y
-        X, Y = np.meshgrid(range(size), range(size))
-
-        # create a plane for z (time) at height i
-        Z = np.full((size, size), i)
-
-        # Flatten all arrays for scatter plot and ensure all arrays have the same length
-        flat_gray_image_data = gray_image_data.flatten()
-        X = X.flatten()[:len(flat_gray_image_data)]
-        Y = Y.flatten()[:len(flat_gray_image_data)]
-        Z = Z.flatten()[:len(flat_gray_image_data)]
+        # Grayscale of the HSV frame, from the cached per-pixel hues
+        gray_image_data = get_colorizer(geometry).gray(normalized_psd)
 
-        # scatter plot with grayscale color
-        ax.scatter(X, Y, Z, c=flat_gray_image_data, cmap='viridis')
+        # Keep only the cells whose PSD is above the static threshold, as a slice
+        # at height i decimated to its share of the point budget
+        cloud.add_slice(i, gray_image_data, geometry.to_plane(normalized_psd) >= 0.6)
 
-    plt.show()
+    # Render the point cloud straight to an image file
+    cloud.render(output_file, cmap='viridis')
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Render the high-PSD cells of IQ data as a 3D point cloud of frames over time.')
+    parser.add_argument('-i', '--input', default='input.bin', help='Input file containing the IQ data.')
+    parser.add_argument('-o', '--output', default='3d_plot.png', help='Output image file.')
+    parser.add_argument('--points', type=int, default=200000, help='Maximum number of points to plot.')
+    parser.add_argument('--max-slices', type=int, default=200, help='Maximum number of time slices; longer captures are sampled evenly.')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), help='Sample format of the input; guessed from its extension by default, otherwise cf32.')
+    parser.add_argument('--remove-dc', action='store_true', help='Subtract the DC offset of every chunk.')
+    parser.add_argument('--autotune', action='store_true', help='Use the fastest nearby FFT length that fills the frame exactly.')
+    args = parser.parse_args()
+    main(args.input, args.output, args.points, args.max_slices, args.format, args.remove_dc, args.autotune)
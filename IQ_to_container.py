@@ -0,0 +1,36 @@
+import argparse
+import numpy as np
+from iq_reader import FORMATS, guess_format, read_block
+from iq_container import ContainerWriter
+
+# Sample rate of the capture, used to size blocks and to seek by time
+input_max = 2.048e6  # Hz
+
+def main(input_file='input.bin', output_file='input.iqz', fmt=None, codec='zlib', level=None, block_seconds=0.5, sample_rate=input_max):
+    # Sample format of the capture; the raw samples are stored unchanged
+    fmt = fmt or guess_format(input_file)
+    dtype = FORMATS[fmt][0]
+
+    # Samples per compressed block; seeking decodes at most one extra block
+    block_samples = max(1, int(sample_rate * block_seconds))
+
+    with open(input_file, 'rb') as f, ContainerWriter(output_file, fmt, dtype, sample_rate, block_samples, codec, level) as writer:
+        raw = np.empty((block_samples, 2), dtype=dtype)
+        while True:
+            count = read_block(f, raw)
+            if count:
+                writer.write(raw[:count].copy())
+            if count < block_samples:
+                break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack a raw IQ capture into a seekable block-compressed container.')
+    parser.add_argument('-i', '--input', default='input.bin', help='Input file containing the IQ data.')
+    parser.add_argument('-o', '--output', default='input.iqz', help='Output container file.')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), help='Sample format of the input; guessed from its extension by default, otherwise cf32.')
+    parser.add_argument('-c', '--codec', default='zlib', choices=['zlib', 'lzma', 'zstd'], help='Block compression; zstd needs the zstandard package.')
+    parser.add_argument('--level', type=int, help='Compression level of the codec.')
+    parser.add_argument('--block-seconds', type=float, default=0.5, help='Length of capture in each compressed block.')
+    parser.add_argument('-r', '--rate', type=float, default=input_max, help='Sample rate of the capture, stored in the container for seeking by time.')
+    args = parser.parse_args()
+    main(args.input, args.output, args.format, args.codec, args.level, args.block_seconds, args.rate)
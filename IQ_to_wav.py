@@ -1,40 +1,25 @@
-import numpy as np
-from scipy.io import wavfile
-from scipy.signal import decimate
+import argparse
+from iq_reader import FORMATS, guess_format, time_window
+from fm_demod import demodulate_to_wav
 
 # Define the chunk size
 chunk_size = 1024*1024  # 1 MB, adjust this value to suit your system
 
-# Prepare an array for the audio data
-audio_array = np.array([])
-
-# Process the file in chunks
-with open('input.bin', 'rb') as f:
-    while True:
-        # Read chunk from file
-        chunk_complex = np.fromfile(f, dtype=np.complex64, count=chunk_size)
-
-        # If chunk is smaller than chunk_size, we've reached the end of the file
-        if chunk_complex.size < chunk_size:
-            break
-
-        # Calculate the instantaneous phase difference (proportional to frequency) of the complex samples
-        instantaneous_phase = np.unwrap(np.angle(chunk_complex))
-        audio = np.diff(instantaneous_phase)
-
-        # We are assuming that the original sample rate was 2.048 MHz.
-        # Decimate to 44.1 kHz for the WAV file.
-        decimation_factor = int(2.048e6 // 44100)
-
-        # Decimate the signal
-        audio_decimated = decimate(audio, decimation_factor, ftype='fir')
-
-        # Normalize the audio to the range -32767 to 32767 for a 16-bit WAV file
-        audio_normalized = np.int16(audio_decimated / np.max(np.abs(audio_decimated)) * 32767)
-
-        # Append to audio array
-        audio_array = np.concatenate((audio_array, audio_normalized))
-
-# Write the audio data to the WAV file
-wavfile.write('output.wav', 44100, audio_array)
-
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='FM-demodulate IQ data into a WAV file.')
+    parser.add_argument('-i', '--input', default='input.bin', help='Input file containing the IQ data.')
+    parser.add_argument('-o', '--output', default='output.wav', help='Output WAV file.')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), help='Sample format of the input; guessed from its extension by default, otherwise cf32.')
+    parser.add_argument('--remove-dc', action='store_true', help='Subtract the DC offset of every chunk.')
+    parser.add_argument('--start', help='Time to start demodulating at, such as 00:12:30 or 750s.')
+    parser.add_argument('--duration', help='Length of capture to demodulate, such as 10s; to the end by default.')
+    args = parser.parse_args()
+    start, count = time_window(args.start, args.duration, 2.048e6, args.input)
+
+    # Demodulate the capture chunk by chunk, carrying the demodulator state across
+    # chunks and writing the 16-bit audio to the WAV file as it is produced.
+    # We are assuming that the original sample rate was 2.048 MHz; the audio is
+    # resampled to exactly 44.1 kHz.
+    demodulate_to_wav(args.input, args.output, input_rate=2.048e6, output_rate=44100, block_size=chunk_size,
+                      fmt=args.format or guess_format(args.input), remove_dc=args.remove_dc,
+                      start=start, count=count)
@@ -1,7 +1,9 @@
-import numpy as np
-from scipy.io import wavfile
-from scipy.signal import decimate
+import os
+import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from iq_reader import guess_format
+from fm_demod import demodulate_to_wav
 
 class FileDialogDemo(QWidget):
     def __init__(self):
@@ -43,37 +45,10 @@ class FileDialogDemo(QWidget):
 
     def process_files(self):
         chunk_size = 1024*1024  # 1 MB, adjust this value to suit your system
-        audio_array = np.array([])  # Prepare an array for the audio data
 
         if self.input_file and self.output_file:
-            with open(self.input_file, 'rb') as f:
-                while True:
-                    # Read chunk from file
-                    chunk_complex = np.fromfile(f, dtype=np.complex64, count=chunk_size)
-
-                    # If chunk is smaller than chunk_size, we've reached the end of the file
-                    if chunk_complex.size < chunk_size:
-                        break
-
-                    # Calculate the instantaneous phase difference (proportional to frequency) of the complex samples
-                    instantaneous_phase = np.unwrap(np.angle(chunk_complex))
-                    audio = np.diff(instantaneous_phase)
-
-                    # We are assuming that the original sample rate was 2.048 MHz.
-                    # Decimate to 44.1 kHz for the WAV file.
-                    decimation_factor = int(2.048e6 // 44100)
-
-                    # Decimate the signal
-                    audio_decimated = decimate(audio, decimation_factor, ftype='fir')
-
-                    # Normalize the audio to the range -32767 to 32767 for a 16-bit WAV file
-                    audio_normalized = np.int16(audio_decimated / np.max(np.abs(audio_decimated)) * 32767)
-
-                    # Append to audio array
-                    audio_array = np.concatenate((audio_array, audio_normalized))
-
-            # Write the audio data to the WAV file
-            wavfile.write(self.output_file, 44100, audio_array)
+            # Demodulate chunk by chunk, writing the audio to the WAV file as it is produced
+            demodulate_to_wav(self.input_file, self.output_file, input_rate=2.048e6, output_rate=44100, block_size=chunk_size, fmt=guess_format(self.input_file))
             self.label.setText("Processing done!")
         else:
             self.label.setText("Please select both input and output files.")
@@ -1,28 +1,18 @@
 import os
 import numpy as np
-from scipy.fft import fft
-import matplotlib.pyplot as plt
-import matplotlib.colors
-import skimage.color as color
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog
-
-# Visible light frequency range in THz (terahertz)
-visible_light_min = 430  # THz
-visible_light_max = 790  # THz
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from iq_reader import guess_format, iter_chunks
+from frame_geometry import get_geometry
+from colorizer import get_colorizer
+from fft_engine import iter_spectra
+from frame_writer import write_png
 
 # Input frequency range in Hz (hertz)
 input_min = 0  # Hz
 input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
 
-# Calculate m and b for the linear transformation
-m = (visible_light_max - visible_light_min) / (input_max - input_min)
-b = visible_light_min - m * input_min
-
-def to_visible_light(input_frequency):
-    """Maps an input frequency to the visible light frequency range."""
-    return m * input_frequency + b
-
 class FileDialogDemo(QWidget):
     def __init__(self):
         super().__init__()
@@ -52,28 +42,18 @@ class FileDialogDemo(QWidget):
             self.main(file_dialog[0])
 
     def main(self, file):
-        # Load the RTL-SDR data from a file
-        iq_data = np.fromfile(file, dtype=np.complex64)
-
         # Chunk size (in number of samples)
         chunk_size = int(input_max * 0.5) 
 
         # Prepare the pictures directory
         os.makedirs('RGBA_Freq_LOG_PSD', exist_ok=True)
 
-        for i in range(len(iq_data)//chunk_size):
-            # Select the current chunk
-            chunk = iq_data[i*chunk_size:(i+1)*chunk_size]
-
-            # Perform FFT to convert IQ data into frequency domain
-            fft_data = fft(chunk)
-            frequencies = np.fft.fftfreq(len(chunk)) * input_max
-
-            # Apply the transformation to each frequency
-            visible_light_frequencies = to_visible_light(np.abs(frequencies))
-
-            # Normalizing frequencies to 0-1 range for color mapping
-            normalized_frequencies = (visible_light_frequencies - np.min(visible_light_frequencies)) / np.ptp(visible_light_frequencies)
+        # Stream the capture from disk and FFT it into the frequency domain,
+        # a batch of chunks at a time across all cores
+        for i, fft_data in iter_spectra(iter_chunks(file, chunk_size, guess_format(file)), chunk_size):
+            # Look up the hue plane and frame size for this chunk length, which are
+            # computed once and shared by every frame
+            geometry = get_geometry(len(fft_data), input_max)
 
             # Compute the power spectral density (PSD) and normalize it for brightness adjustment
             psd = np.abs(fft_data) ** 2
@@ -87,32 +67,12 @@ class FileDialogDemo(QWidget):
             log_psd = np.log(psd + 1e-6)
             normalized_psd = (log_psd - np.min(log_psd)) / (np.max(log_psd) - np.min(log_psd))
 
-            # Combine frequency, PSD, and phase information
-            image_data = np.zeros((len(normalized_frequencies), 4))
-            image_data[:, 0] = normalized_frequencies  # Color (hue)
-            image_data[:, 1] = 1.0  # Saturation
-            image_data[:, 2] = normalized_psd  # Brightness
-            image_data[:, 3] = phase  # Phase
-
-            # Reshaping the frequency array into 2D format
-            size = int(np.sqrt(normalized_frequencies.shape[0]))
-            image_data = image_data[:size**2, :].reshape((size, size, 4))
-
-            # Convert HSV to RGB
-            rgb_image_data = matplotlib.colors.hsv_to_rgb(image_data[:, :, :3])
-
-            # Create an RGBA image
-            rgba_image_data = np.zeros((size, size, 4))
-            rgba_image_data[:, :, :3] = rgb_image_data
-            rgba_image_data[:, :, 3] = image_data[:, :, 3]  # Phase
-
-            # Create the image
-            plt.imshow(rgba_image_data)
-            plt.axis('off')
+            # Colour each pixel as its cached full-brightness hue scaled by the PSD
+            # brightness, with the phase in the alpha channel
+            rgba_image_data = get_colorizer(geometry, quantize=True).rgba(normalized_psd, phase)
 
-            # Save the image
-            plt.savefig(f'RGBA_Freq_LOG_PSD/frame_{i:04d}.png', bbox_inches='tight', pad_inches=0)
-            plt.clf()  # Clear the current figure's content
+            # Save the image at its native resolution
+            write_png(f'RGBA_Freq_LOG_PSD/frame_{i:04d}.png', rgba_image_data)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import numpy as np
+import scipy
+from iq_reader import FORMATS, iter_chunks, parse_time
+from fft_engine import BatchFFT
+from frame_geometry import get_geometry
+from colorizer import get_colorizer
+from frame_writer import encode_png
+from inverse_pipeline import iter_iq_frames
+from fm_demod import demodulate_to_wav
+from synthetic_iq import SIGNALS, write_capture
+
+# Input frequency range in Hz (hertz)
+input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
+
+# Stages of the freq2light frame loop, in order; the render scripts run the
+# same steps as RGBA_freq_to_light.render_frame
+STAGES = ('read', 'fft', 'psd_log', 'colorize', 'encode', 'write')
+
+
+def host_info():
+    """Describes the machine, so results are only compared with like."""
+    return {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+    }
+
+
+def _rates(seconds, samples, frames):
+    return {
+        'seconds': seconds,
+        'samples_per_second': samples / seconds if seconds else None,
+        'frames_per_second': frames / seconds if seconds else None,
+    }
+
+
+def time_render(capture, frame_directory, chunk_size, fmt='cf32'):
+    """
+    Runs the RGBA freq2light frame loop over a capture and returns
+    (seconds per stage, samples, frames).
+
+    Chunks are read into a BatchFFT buffer and transformed in batches, as
+    in iter_spectra, and every frame is written to frame_directory, where
+    time_inverse picks them up.
+    """
+    seconds = dict.fromkeys(STAGES, 0.0)
+    engine = BatchFFT(chunk_size)
+    frames = 0
+
+    def render(count):
+        nonlocal frames
+        clock = time.perf_counter()
+        spectra = engine.transform(count)
+        seconds['fft'] += time.perf_counter() - clock
+        for fft_data in spectra:
+            geometry = get_geometry(len(fft_data), input_max)
+
+            clock = time.perf_counter()
+            phase = np.angle(fft_data) / (2 * np.pi)
+            log_psd = np.log(np.abs(fft_data) ** 2 + 1e-6)
+            normalized_psd = (log_psd - np.min(log_psd)) / (np.max(log_psd) - np.min(log_psd))
+            seconds['psd_log'] += time.perf_counter() - clock
+
+            clock = time.perf_counter()
+            image_data = get_colorizer(geometry, quantize=True).rgba(normalized_psd, phase)
+            seconds['colorize'] += time.perf_counter() - clock
+
+            clock = time.perf_counter()
+            png = encode_png(image_data)
+            seconds['encode'] += time.perf_counter() - clock
+
+            clock = time.perf_counter()
+            with open(os.path.join(frame_directory, f'frame_{frames:04d}.png'), 'wb') as f:
+                f.write(png)
+            seconds['write'] += time.perf_counter() - clock
+            frames += 1
+
+    count = 0
+    chunks = iter_chunks(capture, chunk_size, fmt)
+    while True:
+        # Reading includes converting to complex64 into the FFT buffer
+        clock = time.perf_counter()
+        item = next(chunks, None)
+        if item is not None:
+            engine.buffer[count] = item[1]
+            count += 1
+        seconds['read'] += time.perf_counter() - clock
+        if count and (item is None or count == engine.batch_size):
+            render(count)
+            count = 0
+        if item is None:
+            break
+    return seconds, frames * chunk_size, frames
+
+
+def time_inverse(frame_directory, chunk_size):
+    """Times the RGBA_to_IQ path (PNG decode and inverse FFT) over every frame; returns (seconds, samples, frames)."""
+    clock = time.perf_counter()
+    frames = sum(1 for _ in iter_iq_frames(frame_directory))
+    return time.perf_counter() - clock, frames * chunk_size, frames
+
+
+def time_wav(capture, wav_file, fmt='cf32'):
+    """Times the IQ_to_wav path (FM demodulation and resampling) over a capture; returns seconds."""
+    clock = time.perf_counter()
+    demodulate_to_wav(capture, wav_file, input_rate=input_max, output_rate=44100, fmt=fmt)
+    return time.perf_counter() - clock
+
+
+def run(kind='mix', seconds=2.0, fmt='cf32', chunk_size=int(input_max * 0.5), repeats=3, seed=0, directory=None):
+    """
+    Benchmarks every stage on a synthetic capture and returns the results.
+
+    Each measurement keeps its best of repeats runs, which is the least
+    disturbed by other work on the machine. Captures and frames are written
+    to a temporary directory, or to directory to keep them.
+    """
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = directory or temporary
+        frame_directory = os.path.join(directory, 'frames')
+        os.makedirs(frame_directory, exist_ok=True)
+        capture = os.path.join(directory, f'synthetic.{fmt}')
+        num_samples = write_capture(capture, seconds, kind, fmt, input_max, seed)
+
+        render = inverse = wav = None
+        for _ in range(repeats):
+            stages, samples, frames = time_render(capture, frame_directory, chunk_size, fmt)
+            if render is None or sum(stages.values()) < sum(render[0].values()):
+                render = stages, samples, frames
+            result = time_inverse(frame_directory, chunk_size)
+            if inverse is None or result[0] < inverse[0]:
+                inverse = result
+            result = time_wav(capture, os.path.join(directory, 'output.wav'), fmt)
+            wav = result if wav is None else min(wav, result)
+
+    stages, samples, frames = render
+    results = {stage: _rates(stages[stage], samples, frames) for stage in STAGES}
+    results['freq2light'] = _rates(sum(stages.values()), samples, frames)
+    results['RGBA_to_IQ'] = _rates(*inverse)
+    results['IQ_to_wav'] = _rates(wav, num_samples, num_samples / chunk_size)
+    return {
+        'host': host_info(),
+        'config': {'kind': kind, 'seconds': seconds, 'fmt': fmt, 'chunk_size': chunk_size, 'repeats': repeats, 'seed': seed},
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    Returns the names of the results whose throughput fell more than
+    tolerance (a fraction) below the baseline, printing both side by side.
+    """
+    if baseline['config'] != report['config']:
+        print('Warning: the baseline was run with different settings', baseline['config'])
+    if baseline['host'] != report['host']:
+        print('Warning: the baseline was run on a different host', baseline['host'])
+
+    regressions = []
+    for name, result in report['results'].items():
+        before = baseline['results'].get(name, {}).get('samples_per_second')
+        after = result['samples_per_second']
+        if not before or not after:
+            continue
+        change = after / before - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:>12}: {before:14.0f} -> {after:14.0f} samples/s ({change:+.1%}){flag}')
+    return regressions
+
+
+def print_report(report):
+    for name, result in report['results'].items():
+        print(f"{name:>12}: {result['seconds']:8.3f} s  {result['samples_per_second']:14.0f} samples/s  {result['frames_per_second']:8.2f} frames/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the render and inverse pipelines on a synthetic capture.')
+    parser.add_argument('-k', '--kind', default='mix', choices=SIGNALS, help='Kind of synthetic signal.')
+    parser.add_argument('-d', '--duration', default='2s', help='Length of the synthetic capture, such as 2s.')
+    parser.add_argument('-f', '--format', default='cf32', choices=sorted(FORMATS), help='Sample format of the synthetic capture.')
+    parser.add_argument('-n', '--chunk-size', type=int, default=int(input_max * 0.5), help='Samples per frame.')
+    parser.add_argument('-r', '--repeats', type=int, default=3, help='Runs per measurement; the best is kept.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic signal.')
+    parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+    parser.add_argument('-b', '--baseline', help='Compare with the results in this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Largest drop in throughput, as a fraction, that is not flagged as a regression.')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline instead of comparing.')
+    parser.add_argument('--keep', help='Keep the capture and frames in this directory.')
+    args = parser.parse_args()
+
+    report = run(args.kind, parse_time(args.duration), args.format, args.chunk_size, args.repeats, args.seed, args.keep)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
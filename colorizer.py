@@ -0,0 +1,110 @@
+import functools
+import numpy as np
+import matplotlib.colors
+from skimage.color import rgb2gray
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class Colorizer:
+    """
+    Converts per-bin brightness into RGB frames for one frame geometry.
+
+    With saturation fixed at 1 and the hue fixed per pixel, HSV to RGB is
+    just the brightness times the pixel's full-brightness colour, and its
+    grayscale is the brightness times the grayscale of that colour. Both
+    are computed once here, so each frame is a single multiply into a
+    reusable float32 buffer. The returned buffer is overwritten by the next
+    call.
+
+    With quantize, frames come out as 8-bit pixels instead: the colours are
+    stored pre-scaled to 0-255 and the rounding is fused into the cast, so
+    no float frame is clipped, scaled and converted afterwards. Brightness
+    and alpha are clamped to 0-1 first, with NaN (from a constant frame)
+    mapped to 0, as frame_writer.to_uint8 does for float frames.
+    """
+
+    def __init__(self, geometry, quantize=False):
+        self.geometry = geometry
+        self.quantize = quantize
+        shape = geometry.shape
+
+        hsv_image_data = np.ones(shape + (3,))
+        hsv_image_data[:, :, 0] = geometry.hue_plane
+        base_rgb = matplotlib.colors.hsv_to_rgb(hsv_image_data)
+        base_gray = rgb2gray(base_rgb)
+
+        self.base_rgb = _read_only(base_rgb.astype(np.float32))
+        self.base_gray = _read_only(base_gray.astype(np.float32))
+        self.base_static = _read_only(np.repeat(self.base_gray[:, :, np.newaxis], 3, axis=2))
+        if quantize:
+            self.base_rgb = _read_only(self.base_rgb * np.float32(255))
+            self.base_gray = _read_only(self.base_gray * np.float32(255))
+            self.base_static = _read_only(self.base_static * np.float32(255))
+            self._plane = np.empty(shape, dtype=np.float32)
+            self._alpha = np.empty(shape, dtype=np.float32)
+
+        self._rgb = np.empty(shape + (3,), dtype=np.float32)
+        self._rgba = np.empty(shape + (4,), dtype=np.float32)
+        self._gray = np.empty(shape, dtype=np.float32)
+        self._rgb8 = self._rgba8 = self._gray8 = None
+        if quantize:
+            self._rgb8 = np.empty(shape + (3,), dtype=np.uint8)
+            self._rgba8 = np.empty(shape + (4,), dtype=np.uint8)
+            self._gray8 = np.empty(shape, dtype=np.uint8)
+
+    def _to_plane(self, values, out=None):
+        values = self.geometry.to_plane(values)
+        if not self.quantize:
+            return values
+        # fmax and fmin return the number when the other operand is NaN
+        out = self._plane if out is None else out
+        np.fmax(values, 0.0, out=out)
+        return np.fmin(out, 1.0, out=out)
+
+    def _finish(self, image, image8):
+        if not self.quantize:
+            return image
+        # Round to the nearest level while casting
+        return np.add(image, 0.5, out=image8, casting='unsafe')
+
+    def rgb(self, brightness):
+        """Equivalent to hsv_to_rgb of the (hue, 1.0, brightness) image."""
+        brightness = self._to_plane(brightness)[:, :, np.newaxis]
+        np.multiply(brightness, self.base_rgb, out=self._rgb)
+        return self._finish(self._rgb, self._rgb8)
+
+    def rgba(self, brightness, alpha):
+        """RGB as above with a per-bin alpha channel."""
+        brightness = self._to_plane(brightness)[:, :, np.newaxis]
+        np.multiply(brightness, self.base_rgb, out=self._rgba[:, :, :3])
+        if self.quantize:
+            np.multiply(self._to_plane(alpha, self._alpha), np.float32(255), out=self._rgba[:, :, 3])
+        else:
+            self._rgba[:, :, 3] = self.geometry.to_plane(alpha)
+        return self._finish(self._rgba, self._rgba8)
+
+    def gray(self, brightness):
+        """Equivalent to rgb2gray of the RGB frame."""
+        brightness = self._to_plane(brightness)
+        np.multiply(brightness, self.base_gray, out=self._gray)
+        return self._finish(self._gray, self._gray8)
+
+    def static_rgb(self, brightness, threshold):
+        """
+        RGB frame in which pixels with brightness below threshold are replaced
+        by their grayscale, as static.
+        """
+        brightness = self._to_plane(brightness)[:, :, np.newaxis]
+        base = np.where(brightness < threshold, self.base_static, self.base_rgb)
+        np.multiply(brightness, base, out=self._rgb)
+        return self._finish(self._rgb, self._rgb8)
+
+
+@functools.lru_cache(maxsize=None)
+def get_colorizer(geometry, quantize=False):
+    """Returns the shared Colorizer for a frame geometry and output type."""
+    return Colorizer(geometry, quantize)
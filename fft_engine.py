@@ -0,0 +1,133 @@
+import os
+import functools
+import numpy as np
+import scipy.fft
+import scipy.signal
+
+
+class BatchFFT:
+    """
+    Transforms several equally sized chunks with a single scipy.fft call.
+
+    Chunks are copied into the rows of a preallocated complex64 buffer and
+    transformed in place across all worker threads. scipy.fft keeps a plan
+    cache per transform length, so after the first batch every call reuses
+    the same plan.
+    """
+
+    def __init__(self, chunk_size, batch_size=None, workers=-1):
+        self.workers = os.cpu_count() if workers == -1 else workers
+        self.batch_size = batch_size or self.workers
+        self.buffer = np.empty((self.batch_size, chunk_size), dtype=np.complex64)
+
+    def transform(self, count=None):
+        """FFTs the first count rows of the buffer in place and returns them."""
+        rows = self.buffer[:count or self.batch_size]
+        return scipy.fft.fft(rows, axis=-1, overwrite_x=True, workers=self.workers)
+
+
+def _transformed(engine, indices, cache):
+    # Yields a transformed batch, storing each spectrum in the cache first
+    for i, fft_data in zip(indices, engine.transform(len(indices))):
+        if cache is not None:
+            cache.put(i, fft_data)
+        yield i, fft_data
+
+
+def iter_spectra(chunks, chunk_size, batch_size=None, workers=-1, cache=None):
+    """
+    Yields (index, fft_data) for every (index, chunk) produced by chunks.
+
+    fft_data is a row of a buffer that is reused for the next batch, so it
+    is only valid until the following item is requested. With a cache (see
+    spectrum_cache.SpectrumCache.bind), spectra that are already stored are
+    rebuilt from it instead of transformed, and new ones are added to it. A
+    chunk may also be a function that returns it, as iq_reader.iter_chunks
+    yields with lazy, which is only called when the spectrum is not cached.
+    """
+    engine = BatchFFT(chunk_size, batch_size, workers)
+    indices = []
+    for i, chunk in chunks:
+        if cache is not None:
+            fft_data = cache.get(i)
+            if fft_data is not None:
+                # Finish the batch first, so spectra stay in order
+                if indices:
+                    yield from _transformed(engine, indices, cache)
+                    indices = []
+                yield i, fft_data
+                continue
+        engine.buffer[len(indices)] = chunk() if callable(chunk) else chunk
+        indices.append(i)
+        if len(indices) == engine.batch_size:
+            yield from _transformed(engine, indices, cache)
+            indices = []
+    if indices:
+        yield from _transformed(engine, indices, cache)
+
+
+@functools.lru_cache(maxsize=None)
+def get_window(window, length):
+    """Returns a periodic analysis window as float32, computed once per name and length."""
+    return scipy.signal.get_window(window, length).astype(np.float32)
+
+
+def iter_stft(blocks, window_size, hop, window='boxcar', fft_size=None, batch_size=None, workers=-1, skip=None, cache=None):
+    """
+    Yields (index, fft_data) for analysis windows of window_size samples
+    that start every hop samples of the complex64 blocks.
+
+    Windows may overlap (hop < window_size) or leave gaps between them, so
+    the frame rate no longer depends on the FFT length. Blocks are consumed
+    as they arrive and every sample is read once; only the overlap with the
+    next window is carried over. Each window is tapered straight into a row
+    of a BatchFFT buffer, zero-padded to fft_size if that is larger, and
+    transformed once in batches. Windows for which skip(index) is true are
+    not transformed. As with iter_spectra, fft_data is only valid until the
+    following item is requested, and a cache supplies and keeps spectra.
+    """
+    fft_size = fft_size or window_size
+    if fft_size < window_size:
+        raise ValueError(f'FFT size {fft_size} is shorter than the window of {window_size} samples')
+    taper = get_window(window, window_size)
+    engine = BatchFFT(fft_size, batch_size, workers)
+    indices = []
+    i = 0
+    tail = np.zeros(0, dtype=np.complex64)
+    gap = 0  # samples in a gap between windows that are still to come
+    for block in blocks:
+        if gap:
+            dropped = min(gap, len(block))
+            block = block[dropped:]
+            gap -= dropped
+        buffer = np.concatenate((tail, block)) if len(tail) else block
+        count = 0 if len(buffer) < window_size else (len(buffer) - window_size) // hop + 1
+        for start in range(0, count * hop, hop):
+            i += 1
+            if skip is not None and skip(i - 1):
+                continue
+            if cache is not None:
+                fft_data = cache.get(i - 1)
+                if fft_data is not None:
+                    if indices:
+                        yield from _transformed(engine, indices, cache)
+                        indices = []
+                    yield i - 1, fft_data
+                    continue
+            row = engine.buffer[len(indices)]
+            np.multiply(buffer[start:start + window_size], taper, out=row[:window_size])
+            row[window_size:] = 0
+            indices.append(i - 1)
+            if len(indices) == engine.batch_size:
+                yield from _transformed(engine, indices, cache)
+                indices = []
+
+        # Keep the samples the next window still needs
+        consumed = count * hop
+        if consumed <= len(buffer):
+            tail = buffer[consumed:].copy()
+        else:
+            tail = tail[:0]
+            gap = consumed - len(buffer)
+    if indices:
+        yield from _transformed(engine, indices, cache)
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import platform
+import argparse
+import numpy as np
+import scipy
+import scipy.fft
+from frame_geometry import frame_shape
+
+# Planned chunk sizes are kept per user and reused by every script, like FFTW wisdom
+WISDOM_FILE = os.environ.get('FFT_WISDOM', os.path.join(os.path.expanduser('~'), '.radio_waves_fft_wisdom.json'))
+
+
+def _host_key():
+    # Timings only carry over to the same kind of machine and FFT library
+    return f'{platform.machine()}-{os.cpu_count()}cpu-scipy{scipy.__version__}'
+
+
+def candidate_sizes(target, layout='square', tolerance=0.05, max_aspect=2.0):
+    """
+    Returns the chunk sizes within tolerance of target that scipy.fft
+    transforms quickly and that fill their frame exactly: perfect squares for
+    the square layout, and factorizations no wider than max_aspect for the
+    rect layout.
+    """
+    low, high = int(target * (1 - tolerance)), int(target * (1 + tolerance))
+    sizes = []
+    if layout == 'square':
+        for side in range(int(np.ceil(np.sqrt(low))), int(np.sqrt(high)) + 1):
+            if scipy.fft.next_fast_len(side * side) == side * side:
+                sizes.append(side * side)
+        return sizes
+
+    length = scipy.fft.next_fast_len(max(low, 1))
+    while length <= high:
+        rows, cols = frame_shape(length, layout)
+        if cols <= max_aspect * rows:
+            sizes.append(length)
+        length = scipy.fft.next_fast_len(length + 1)
+    return sizes
+
+
+def time_fft(length, repeats=5, workers=-1):
+    """Returns the best time of repeats complex64 FFTs of length samples, per sample."""
+    x = np.exp(2j * np.pi * np.random.rand(length)).astype(np.complex64)
+    scipy.fft.fft(x, workers=workers)  # builds the plan
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scipy.fft.fft(x, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best / length
+
+
+def load_wisdom(wisdom_file=WISDOM_FILE):
+    try:
+        with open(wisdom_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_wisdom(wisdom, wisdom_file=WISDOM_FILE):
+    # Write a temporary file and rename it, so concurrent runs never read half a file
+    temporary = f'{wisdom_file}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(wisdom, f, indent=1, sort_keys=True)
+    os.replace(temporary, wisdom_file)
+
+
+def plan_chunk_size(target, layout='square', tolerance=0.05, wisdom_file=WISDOM_FILE):
+    """
+    Returns the chunk size near target with the fastest FFT per sample on this
+    host that fills a frame of the given layout without dropping bins.
+
+    The candidates are benchmarked on the first call only; the choice is
+    stored in the wisdom file and returned directly by later runs. If no
+    candidate lies within tolerance, target is returned unchanged.
+    """
+    key = f'{_host_key()}:{target}:{layout}:{tolerance}'
+    wisdom = load_wisdom(wisdom_file)
+    if key in wisdom:
+        return wisdom[key]
+
+    sizes = candidate_sizes(target, layout, tolerance)
+    best = min(sizes, key=time_fft) if sizes else target
+    wisdom = load_wisdom(wisdom_file)
+    wisdom[key] = best
+    save_wisdom(wisdom, wisdom_file)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark FFT lengths near a chunk size and store the fastest in the wisdom file.')
+    parser.add_argument('-n', '--target', type=int, default=int(2.048e6 * 0.5), help='Chunk size to plan around.')
+    parser.add_argument('--layout', default='square', choices=['square', 'rect'], help='Frame layout the chunk must fill.')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='Largest relative change of the chunk size.')
+    args = parser.parse_args()
+
+    print(f'{args.target}: {time_fft(args.target) * 1e9:.2f} ns/sample ({frame_shape(args.target, args.layout)} frame)')
+    for size in candidate_sizes(args.target, args.layout, args.tolerance):
+        print(f'{size}: {time_fft(size) * 1e9:.2f} ns/sample ({frame_shape(size, args.layout)} frame)')
+    print(f'Planned chunk size: {plan_chunk_size(args.target, args.layout, args.tolerance)}')
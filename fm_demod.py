@@ -0,0 +1,132 @@
+import wave
+from math import gcd
+import numpy as np
+from scipy.signal import firwin
+from iq_reader import iter_blocks
+
+
+class StreamingResampler:
+    """
+    Rational up/down resampler that keeps its filter state between blocks.
+
+    Uses the same Kaiser-windowed FIR and alignment as
+    scipy.signal.resample_poly, so feeding a signal through in any number of
+    blocks and then calling flush() gives the same samples as one
+    resample_poly call on the whole signal, in constant memory.
+    """
+
+    # Outputs computed per vectorized step, bounding the gather buffer
+    batch_size = 4096
+
+    def __init__(self, up, down):
+        g = gcd(up, down)
+        self.up, self.down = up // g, down // g
+        # Equal rates pass samples straight through, as resample_poly does
+        self.passthrough = self.up == self.down == 1
+        if self.passthrough:
+            return
+        max_rate = max(self.up, self.down)
+        self.half_len = 10 * max_rate
+        h = firwin(2 * self.half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)) * self.up
+
+        # phases[p, k] is the tap applied to the input sample k steps before
+        # the newest one for outputs at upsampled phase p
+        self.taps_per_phase = -(-len(h) // self.up)
+        h = np.concatenate((h, np.zeros(self.taps_per_phase * self.up - len(h))))
+        self.phases = h.reshape((self.taps_per_phase, self.up)).T.copy()
+
+        # The signal is zero before its first sample
+        self.history = np.zeros(self.taps_per_phase)
+        self.offset = -self.taps_per_phase  # input index of history[0]
+        self.consumed = 0  # input samples seen so far
+        self.n = 0  # index of the next output sample
+
+    def _resample(self, samples, n_stop):
+        buffer = np.concatenate((self.history, samples))
+        n = np.arange(self.n, n_stop)
+        t = n * self.down + self.half_len
+        newest = t // self.up
+        phase = t - newest * self.up
+        lags = np.arange(self.taps_per_phase)
+
+        out = np.empty(len(n))
+        for start in range(0, len(n), self.batch_size):
+            stop = start + self.batch_size
+            indices = (newest[start:stop] - self.offset)[:, np.newaxis] - lags
+            out[start:stop] = np.einsum('ij,ij->i', buffer[indices], self.phases[phase[start:stop]])
+
+        # Keep only the samples the next output can still reach
+        end = self.offset + len(buffer)
+        keep_from = min((n_stop * self.down + self.half_len) // self.up - (self.taps_per_phase - 1), end)
+        self.history = buffer[keep_from - self.offset:]
+        self.offset = keep_from
+        self.n = n_stop
+        return out
+
+    def process(self, samples):
+        """Returns every output sample that the input seen so far fully determines."""
+        if self.passthrough:
+            return np.array(samples, dtype=float)
+        self.consumed += len(samples)
+        end = self.offset + len(self.history) + len(samples)
+        n_stop = max(self.n, -(-(end * self.up - self.half_len) // self.down))
+        return self._resample(samples, n_stop)
+
+    def flush(self):
+        """Returns the remaining output samples, treating the signal as zero after its end."""
+        if self.passthrough:
+            return np.zeros(0)
+        n_stop = -(-self.consumed * self.up // self.down)
+        return self._resample(np.zeros(self.taps_per_phase), n_stop)
+
+
+class FMDemodulator:
+    """
+    Streaming FM demodulator from complex IQ to audio at output_rate.
+
+    The phase difference between consecutive samples is proportional to the
+    instantaneous frequency. The last sample of each block is carried over
+    to the next one, and the resampler keeps its filter state, so block
+    boundaries leave no seams. Audio is scaled so that a frequency deviation
+    of +/- deviation Hz maps to full scale.
+    """
+
+    def __init__(self, input_rate=2.048e6, output_rate=44100, deviation=75e3):
+        self.resampler = StreamingResampler(int(output_rate), int(input_rate))
+        self.scale = input_rate / (2 * np.pi * deviation)
+        self.previous = None
+
+    def process(self, iq):
+        if len(iq) == 0:
+            return np.zeros(0)
+        previous = iq[:1] if self.previous is None else self.previous
+        audio = np.angle(iq * np.conj(np.concatenate((previous, iq[:-1])))) * self.scale
+        self.previous = iq[-1:]
+        return self.resampler.process(audio)
+
+    def flush(self):
+        return self.resampler.flush()
+
+
+def to_int16(audio):
+    """Converts audio in the -1 to 1 range to 16-bit samples, clipping overshoot."""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def demodulate_to_wav(input_file, output_file, input_rate=2.048e6, output_rate=44100, deviation=75e3, block_size=1024*1024, fmt='cf32', remove_dc=False, start=0, count=None):
+    """
+    FM-demodulates an IQ capture into a 16-bit mono WAV file.
+
+    The capture is read and written block by block, including the final
+    partial block, so memory use is constant and run time is linear in the
+    capture length. See iq_reader.FORMATS for the supported sample formats.
+    start and count select a window of the capture in samples.
+    """
+    demodulator = FMDemodulator(input_rate, output_rate, deviation)
+    with wave.open(output_file, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(int(output_rate))
+        for block in iter_blocks(input_file, block_size, fmt, remove_dc, start, count):
+            wav.writeframes(to_int16(demodulator.process(block)).tobytes())
+        wav.writeframes(to_int16(demodulator.flush()).tobytes())
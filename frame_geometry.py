@@ -0,0 +1,75 @@
+import functools
+import numpy as np
+
+# Visible light frequency range in THz (terahertz)
+visible_light_min = 430  # THz
+visible_light_max = 790  # THz
+
+# Input frequency range in Hz (hertz)
+input_min = 0  # Hz
+
+
+def to_visible_light(input_frequency, input_max):
+    """Maps an input frequency to the visible light frequency range."""
+    m = (visible_light_max - visible_light_min) / (input_max - input_min)
+    b = visible_light_min - m * input_min
+    return m * input_frequency + b
+
+
+def frame_shape(chunk_size, layout='square'):
+    """
+    Returns the (rows, cols) of the frame that a chunk of FFT bins fills.
+
+    The square layout keeps the largest square that fits, dropping the bins
+    beyond it unless chunk_size is a perfect square. The rect layout uses
+    every bin, in the most nearly square rows x cols factorization.
+    """
+    side = int(np.sqrt(chunk_size))
+    if layout == 'square':
+        return side, side
+    if layout == 'rect':
+        rows = next(d for d in range(side, 0, -1) if chunk_size % d == 0)
+        return rows, chunk_size // rows
+    raise ValueError(f'Unknown frame layout: {layout}')
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class FrameGeometry:
+    """
+    Per-pixel arrays that depend only on the chunk length and sample rate.
+
+    The hue of every pixel comes from the frequency of its FFT bin, so it is
+    the same for every frame of a capture. Arrays are read-only because one
+    instance is shared by every frame and render style.
+    """
+
+    def __init__(self, chunk_size, sample_rate, layout='square'):
+        self.chunk_size = chunk_size
+        self.sample_rate = sample_rate
+        self.layout = layout
+
+        # Apply the transformation to each frequency
+        frequencies = np.fft.fftfreq(chunk_size) * sample_rate
+        visible_light_frequencies = to_visible_light(np.abs(frequencies), sample_rate)
+
+        # Normalizing frequencies to 0-1 range for color mapping
+        self.hue = _read_only((visible_light_frequencies - np.min(visible_light_frequencies)) / np.ptp(visible_light_frequencies))
+
+        # Reshaping the frequency array into 2D format
+        self.shape = frame_shape(chunk_size, layout)
+        self.size = self.shape[0]  # side of a square frame
+        self.hue_plane = self.to_plane(self.hue)
+
+    def to_plane(self, values):
+        """Reshapes per-bin values into the (rows, cols) frame layout."""
+        return values[:self.shape[0] * self.shape[1]].reshape(self.shape)
+
+
+@functools.lru_cache(maxsize=None)
+def get_geometry(chunk_size, sample_rate, layout='square'):
+    """Returns the shared FrameGeometry for a (chunk_size, sample_rate, layout) key."""
+    return FrameGeometry(chunk_size, sample_rate, layout)
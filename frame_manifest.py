@@ -0,0 +1,110 @@
+import os
+import json
+import stat
+import hashlib
+import inspect
+from socket_ingest import is_address
+
+
+def input_identity(path):
+    """
+    Identifies a capture by its path, size and modification time, or returns
+    None for pipes, FIFOs and sockets, whose contents cannot be told apart.
+    """
+    if is_address(path):
+        return None
+    st = os.stat(path)
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def render_params(render_frame, **params):
+    """
+    Returns the parameters that determine a frame's pixels, including a hash
+    of the render function's source, so editing a render step such as a
+    threshold also invalidates its frames.
+    """
+    source = inspect.getsource(render_frame).encode()
+    return dict(params, render=hashlib.sha256(source).hexdigest()[:16])
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FrameManifest:
+    """
+    Record of the frames in an output directory, so an interrupted or
+    repeated render only computes the frames that are missing or stale.
+
+    Frame i covers samples first + i * step to first + i * step + length of
+    the input. Each rendered frame appends one JSON line with the input
+    identity, that sample range, the render parameters and the SHA-256 of
+    the written file. A frame is skipped on the next run only if all of them
+    still match, so changing a parameter or the window of the capture
+    re-renders only the frames it affects. Appending line by line keeps the
+    manifest valid if the render is killed part way.
+    """
+
+    def __init__(self, directory, input_file, params, first=0, step=1, length=1, name='manifest.jsonl'):
+        self.directory = directory
+        self.path = os.path.join(directory, name)
+        self.input = input_identity(input_file)
+        # Compare parameters as they read back from JSON, where tuples are lists
+        self.params = json.loads(json.dumps(params))
+        self.first, self.step, self.length = first, step, length
+        self.frames = {}
+        if self.input is None or not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path) as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                self.frames[entry['frame']] = entry
+
+        # Drop entries superseded by later runs
+        if lines > len(self.frames):
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as f:
+                for i in sorted(self.frames):
+                    f.write(json.dumps(self.frames[i]) + '\n')
+            os.replace(temporary, self.path)
+
+    def frame_path(self, i):
+        return os.path.join(self.directory, f'frame_{i:04d}.png')
+
+    def _expected(self, i):
+        return {
+            'frame': i,
+            'input': self.input,
+            'samples': [self.first + i * self.step, self.length],
+            'params': self.params,
+        }
+
+    def is_valid(self, i):
+        """Returns whether frame i was already rendered from the same samples and parameters."""
+        entry = self.frames.get(i)
+        if self.input is None or entry is None:
+            return False
+        if any(entry.get(key) != value for key, value in self._expected(i).items()):
+            return False
+        path = self.frame_path(i)
+        return os.path.exists(path) and file_hash(path) == entry['sha256']
+
+    def record(self, i):
+        """Hashes the frame just written for index i and appends it to the manifest."""
+        if self.input is None:
+            return
+        entry = dict(self._expected(i), sha256=file_hash(self.frame_path(i)))
+        self.frames[i] = entry
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
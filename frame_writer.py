@@ -0,0 +1,67 @@
+import struct
+import zlib
+import numpy as np
+import render_metrics
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG colour type for each supported number of channels
+COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+
+
+def to_uint8(image):
+    """Quantizes a float image in the 0-1 range to 8-bit pixels."""
+    if image.dtype == np.uint8:
+        return image
+    pixels = np.clip(image, 0.0, 1.0)
+    np.nan_to_num(pixels, copy=False)
+    pixels *= 255.0
+    pixels += 0.5
+    return pixels.astype(np.uint8)
+
+
+def _png_chunk(tag, data):
+    crc = zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc)
+
+
+def encode_png(image, compress_level=1):
+    """
+    Encodes a (height, width), (height, width, 3) or (height, width, 4) image
+    as PNG bytes, one pixel per array element.
+    """
+    pixels = to_uint8(image)
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, np.newaxis]
+    height, width, channels = pixels.shape
+    if channels not in COLOR_TYPES:
+        raise ValueError(f'Cannot encode an image with {channels} channels as PNG')
+
+    # Every scanline starts with its filter type byte (0 = no filtering)
+    scanlines = np.zeros((height, 1 + width * channels), dtype=np.uint8)
+    scanlines[:, 1:] = pixels.reshape(height, -1)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, COLOR_TYPES[channels], 0, 0, 0)
+    return b''.join([
+        PNG_SIGNATURE,
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'IDAT', zlib.compress(scanlines, compress_level)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def write_png(path, image, compress_level=1):
+    """
+    Writes an image straight to a PNG file at its native resolution.
+
+    Unlike plt.imshow + plt.savefig, no figure is laid out and the image is
+    not resampled, so a (size, size, 3) array becomes a size x size PNG.
+    Float images are expected in the 0-1 range and are clipped to it.
+    """
+    metrics = render_metrics.current
+    with metrics.stage('encode'):
+        png = encode_png(image, compress_level)
+    with metrics.stage('write'):
+        with open(path, 'wb') as f:
+            f.write(png)
+    metrics.count('bytes_written', len(png))
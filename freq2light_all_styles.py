@@ -0,0 +1,42 @@
+import argparse
+from render_runner import RenderOptions, add_arguments, exit_on_missing_input, render_capture
+import freq2light_LOG_PSD
+import freq2light_staticgrayscale_LOG_PSD
+import RGBA_freq_to_light
+import freq2light_Magnitude_Norm
+import freq2light_polar_LOG_PSD
+
+# Input frequency range in Hz (hertz)
+input_min = 0  # Hz
+input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
+
+# Render styles by name, with the script that renders them and its output directory
+STYLES = {
+    'LOG_PSD': (freq2light_LOG_PSD, 'frames_LOG_PSD'),
+    'static': (freq2light_staticgrayscale_LOG_PSD, 'frames_static_LOG_PSD'),
+    'RGBA': (RGBA_freq_to_light, 'RGBA_Freq_LOG_PSD'),
+    'Mag_Norm': (freq2light_Magnitude_Norm, 'frames_Mag_Norm'),
+    'polar': (freq2light_polar_LOG_PSD, 'frames'),
+}
+DEFAULT_STYLES = ('LOG_PSD', 'static', 'RGBA', 'Mag_Norm')
+
+def main(input_file='input.bin', styles=DEFAULT_STYLES, options=None, **overrides):
+    # Chunk size (in number of samples)
+    chunk_size = int(input_max * 0.5)
+
+    # Read and FFT every chunk once, then fan the spectrum out to every
+    # style. Each style keeps its own output directory and frame manifest,
+    # with the same parameters its own script records, so frames rendered
+    # here and by the single-style scripts are interchangeable
+    render_capture(input_file, [(module.render_frame, directory, getattr(module, 'frame_layout', 'square'))
+                                for module, directory in (STYLES[style] for style in styles)],
+                   input_max, chunk_size, options, **overrides)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render IQ data in several frame styles from a single pass over the capture.')
+    parser.add_argument('-i', '--input', default='input.bin', help='Input file containing the IQ data.')
+    parser.add_argument('-s', '--styles', nargs='+', choices=list(STYLES), default=list(DEFAULT_STYLES), help='Styles to render, each into its usual output directory.')
+    add_arguments(parser)
+    args = parser.parse_args()
+    with exit_on_missing_input(parser):
+        main(args.input, args.styles, RenderOptions.from_args(args))
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import imageio
+from iq_reader import iter_chunks
+from frame_writer import to_uint8
+from render_runner import render_capture
+from render_reference import REFERENCES
+from synthetic_iq import SIGNALS, write_capture
+from freq2light_all_styles import STYLES
+
+# Input frequency range in Hz (hertz)
+input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
+
+# Ways of running the render scripts, as render_capture options. Every one
+# renders through the script's own render_frame, so the lookup-table
+# colourizer, the 8-bit quantization, the direct PNG writer and the cached
+# polar warp are checked by all of them.
+BACKENDS = {
+    'serial': {},
+    'parallel': {'processes': 2},
+    'stft': {'fps': 'chunk'},  # one boxcar window per chunk, through iter_stft
+}
+
+# Per style: the difference from the reference in 8-bit levels that most
+# pixels must stay within, the largest fraction of pixels that may differ
+# at all, and the largest fraction that may differ by more. Against the
+# complex64 reference, single precision rounds a few pixels to the
+# neighbouring level.
+TOLERANCES = {
+    'LOG_PSD': (1, 0.01, 0.0),
+    'static': (1, 0.01, 0.0),
+    'RGBA': (1, 0.01, 0.0),
+    'Mag_Norm': (1, 0.01, 0.0),
+    'polar': (1, 0.01, 0.0),
+}
+
+# Against the float64 reference, the complex64 FFT moves the log-PSD of
+# weak bins by up to a level of brightness. Static pixels right at the
+# threshold then flip between colour and grayscale, and the alpha of RGBA
+# pixels with a phase right at +/-pi wraps around, so a few pixels differ
+# by a lot.
+FLOAT64_TOLERANCES = {
+    'LOG_PSD': (1, 0.05, 0.0),
+    'static': (1, 0.05, 0.001),
+    'RGBA': (1, 0.05, 0.0001),
+    'Mag_Norm': (1, 0.01, 0.0),
+    'polar': (1, 0.05, 0.001),
+}
+
+
+def compare_frames(reference, frame, levels=1):
+    """
+    Returns the max and mean absolute difference in 8-bit levels, the
+    fraction of pixels that differ, and the fraction that differ by more
+    than levels.
+    """
+    if reference.shape != frame.shape:
+        raise ValueError(f'Frame of shape {frame.shape} does not match the reference {reference.shape}')
+    error = np.abs(reference.astype(np.int16) - frame.astype(np.int16))
+    if error.ndim == 3:
+        error = error.max(axis=2)
+    return int(error.max()), float(error.mean()), float(np.count_nonzero(error)) / error.size, float(np.count_nonzero(error > levels)) / error.size
+
+
+def render_reference(style, capture, chunk_size, float64=False):
+    """
+    Renders every chunk of a capture with the reference implementation;
+    returns (8-bit frames, seconds). The reference computes in the precision
+    of the samples, complex64, or in float64 from end to end with float64.
+    """
+    frames = []
+    seconds = 0.0
+    for i, chunk in iter_chunks(capture, chunk_size):
+        chunk = np.array(chunk, dtype=np.complex128 if float64 else np.complex64)
+        clock = time.perf_counter()
+        frames.append(to_uint8(REFERENCES[style](chunk, input_max)))
+        seconds += time.perf_counter() - clock
+    return frames, seconds
+
+
+def render_backend(style, backend, capture, chunk_size, directory):
+    """Renders a capture with a render script in directory; returns (decoded frames, seconds)."""
+    module, frame_directory = STYLES[style]
+    options = dict(BACKENDS[backend])
+    if options.get('fps') == 'chunk':
+        options['fps'] = input_max / chunk_size
+    os.makedirs(directory, exist_ok=True)
+
+    # The render scripts write to directories relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        clock = time.perf_counter()
+        render_capture(capture, [(module.render_frame, frame_directory, getattr(module, 'frame_layout', 'square'))],
+                       input_max, chunk_size, **options)
+        seconds = time.perf_counter() - clock
+    finally:
+        os.chdir(cwd)
+
+    paths = sorted(f for f in os.listdir(os.path.join(directory, frame_directory)) if f.endswith('.png'))
+    return [np.asarray(imageio.imread(os.path.join(directory, frame_directory, path))) for path in paths], seconds
+
+
+def run(styles, backends, frames=2, chunk_size=512 * 512, kind='mix', seed=0, float64=False):
+    """
+    Renders a synthetic capture with the reference implementation and every
+    backend, style by style, and returns one result per (style, backend).
+
+    Backend timings cover reading, transforming, rendering and writing the
+    PNG frames, while the reference is timed up to the float image, without
+    the pyplot figure it used to be saved through, so speedups are on the
+    low side. With float64, the frames are checked against a float64
+    reference, within FLOAT64_TOLERANCES.
+    """
+    tolerances = FLOAT64_TOLERANCES if float64 else TOLERANCES
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        capture = os.path.abspath(os.path.join(directory, 'golden.cf32'))
+        write_capture(capture, frames * chunk_size / input_max, kind, 'cf32', input_max, seed)
+
+        for style in styles:
+            reference, reference_seconds = render_reference(style, capture, chunk_size, float64)
+            max_error, max_mismatch, max_outliers = tolerances[style]
+
+            # The fast paths build their per-geometry tables on the first
+            # frame and keep them, so one untimed render puts every backend
+            # on an equal footing
+            render_backend(style, 'serial', capture, chunk_size, os.path.join(directory, style, 'warmup'))
+            for backend in backends:
+                rendered, seconds = render_backend(style, backend, capture, chunk_size, os.path.join(directory, style, backend))
+                if len(rendered) != len(reference):
+                    raise ValueError(f'{style}/{backend} rendered {len(rendered)} frames, not {len(reference)}')
+                errors = [compare_frames(expected, frame, max_error) for expected, frame in zip(reference, rendered)]
+                result = {
+                    'style': style,
+                    'backend': backend,
+                    'max_error': max(error[0] for error in errors),
+                    'mean_error': float(np.mean([error[1] for error in errors])),
+                    'mismatch': max(error[2] for error in errors),
+                    'outliers': max(error[3] for error in errors),
+                    'reference_seconds_per_frame': reference_seconds / len(reference),
+                    'seconds_per_frame': seconds / len(rendered),
+                    'speedup': reference_seconds / seconds,
+                }
+                result['passed'] = result['mismatch'] <= max_mismatch and result['outliers'] <= max_outliers
+                results.append(result)
+                print_result(result)
+    return results
+
+
+def print_result(result):
+    print(f"{result['style']:>8} {result['backend']:>8}: max {result['max_error']:3d}  mean {result['mean_error']:.5f}  "
+          f"differing {result['mismatch']:.3%}  by more {result['outliers']:.3%}  {result['reference_seconds_per_frame']:7.3f} -> {result['seconds_per_frame']:7.3f} s/frame "
+          f"({result['speedup']:5.1f}x)  {'ok' if result['passed'] else 'FAILED'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check that the optimized render paths still draw the frames of the reference implementation.')
+    parser.add_argument('-s', '--styles', nargs='+', choices=list(STYLES), default=list(STYLES), help='Styles to check.')
+    parser.add_argument('-b', '--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS), help='Backends to check.')
+    parser.add_argument('-n', '--chunk-size', type=int, default=512 * 512, help='Samples per frame; the polar reference takes seconds per frame at the default and minutes at full size.')
+    parser.add_argument('--frames', type=int, default=2, help='Number of frames in the synthetic capture.')
+    parser.add_argument('-k', '--kind', default='mix', choices=SIGNALS, help='Kind of synthetic signal.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic signal.')
+    parser.add_argument('--float64', action='store_true', help='Check against a float64 reference instead of one in the precision of the samples.')
+    parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = run(args.styles, args.backends, args.frames, args.chunk_size, args.kind, args.seed, args.float64)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if not all(result['passed'] for result in results):
+        sys.exit(1)
@@ -0,0 +1,106 @@
+import os
+import re
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import scipy.fft
+import imageio
+
+
+def numerical_sort(filenames):
+    """
+    Sorts the given iterable in the way that humans expect.
+    (i.e., 'frame10.bin' comes after 'frame2.bin')
+    """
+    convert = lambda text: int(text) if text.isdigit() else text
+    alphanum_key = lambda key: [convert(c) for c in re.split('([0-9]+)', key)]
+    return sorted(filenames, key=alphanum_key)
+
+
+def image_to_spectrum(img):
+    """
+    Recovers the complex spectrum of an RGBA frame in float32/complex64.
+
+    Only the HSV brightness (the PSD) and the alpha channel (the phase) are
+    needed to rebuild the spectrum, and the HSV value is simply the largest
+    of the R, G and B channels, so no full RGB to HSV conversion is done.
+    """
+    img = np.asarray(img, dtype=np.float32) / np.float32(255.0)
+
+    # Denormalize PSD, assuming log_psd was normalized to [0, 1] and the
+    # original range was [-40, -20]
+    normalized_psd = img[:, :, :3].max(axis=2)
+    log_psd = np.clip(normalized_psd * 20 - 40, -709, 709)
+
+    # Denormalize phase
+    phase = img[:, :, 3] * np.float32(2 * np.pi)
+
+    # Compute complex FFT data from magnitudes (sqrt of the PSD) and phases
+    magnitudes = np.exp(log_psd / 2)
+    fft_data = np.empty(magnitudes.shape, dtype=np.complex64)
+    fft_data.real = magnitudes * np.cos(phase)
+    fft_data.imag = magnitudes * np.sin(phase)
+    return fft_data
+
+
+def _decode(path):
+    return image_to_spectrum(imageio.imread(path))
+
+
+def iter_iq_frames(input_directory, threads=None, workers=-1):
+    """
+    Yields (filename, chunk) for every PNG in input_directory in numerical_sort order.
+
+    PNG decoding and the spectrum recovery run in a thread pool a bounded
+    number of frames ahead, while the inverse FFT of each frame uses all
+    cores through scipy.fft. Each chunk is the complex64 IQ data of one frame.
+    """
+    filenames = [f for f in numerical_sort(os.listdir(input_directory)) if f.endswith(".png")]
+    threads = threads or os.cpu_count()
+    with ThreadPoolExecutor(threads) as executor:
+        pending = collections.deque()
+        for filename in filenames:
+            pending.append((filename, executor.submit(_decode, os.path.join(input_directory, filename))))
+            if len(pending) > 2 * threads:
+                yield _finish(*pending.popleft(), workers)
+        while pending:
+            yield _finish(*pending.popleft(), workers)
+
+
+def _finish(filename, future, workers):
+    # Perform inverse FFT to convert frequency domain data back into IQ data
+    return filename, scipy.fft.ifft(future.result(), overwrite_x=True, workers=workers)
+
+
+def synthesize(input_directory, output_file, overlap=0, threads=None, workers=-1):
+    """
+    Reconstructs the IQ data of every frame in input_directory straight into
+    one output file, in numerical_sort order.
+
+    Each frame is written with a single sequential write as soon as it is
+    recovered, so no per-frame files are staged. With overlap > 0,
+    consecutive frames are cross-faded over that many samples with
+    complementary sin^2/cos^2 windows, which sum to one, instead of being
+    butted together with a hard seam. The output is then overlap samples
+    shorter per frame boundary.
+    """
+    fade_in = fade_out = tail = last = None
+    with open(output_file, 'wb') as f:
+        for _, chunk in iter_iq_frames(input_directory, threads, workers):
+            chunk = chunk.ravel()
+            if overlap:
+                if overlap >= len(chunk):
+                    raise ValueError(f'Overlap of {overlap} samples does not fit in frames of {len(chunk)} samples')
+                if fade_in is None:
+                    fade_in = (np.sin(np.linspace(0, np.pi / 2, overlap + 2)[1:-1]) ** 2).astype(np.float32)
+                    fade_out = fade_in[::-1]
+                if tail is not None:
+                    chunk[:overlap] = chunk[:overlap] * fade_in + tail
+                last = chunk[-overlap:].copy()
+                tail = last * fade_out
+                chunk = chunk[:-overlap]
+            f.write(chunk)
+
+        # The end of the last frame has nothing to fade into
+        if last is not None:
+            f.write(last)
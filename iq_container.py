@@ -0,0 +1,191 @@
+import json
+import lzma
+import struct
+import zlib
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'IQZ1'
+
+# index_offset, block_count, num_samples, magic
+FOOTER = struct.Struct('<QQQ4s')
+
+# One entry per block: first sample, file offset and compressed size
+INDEX_DTYPE = np.dtype([('sample', '<u8'), ('offset', '<u8'), ('size', '<u8')])
+
+
+def _compressor(codec, level):
+    if codec == 'zlib':
+        return lambda data: zlib.compress(data, 6 if level is None else level)
+    if codec == 'lzma':
+        return lambda data: lzma.compress(data, preset=6 if level is None else level)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('The zstd codec requires the zstandard package')
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress
+    raise ValueError(f'Unknown codec: {codec}')
+
+
+def _decompressor(codec):
+    if codec == 'zlib':
+        return zlib.decompress
+    if codec == 'lzma':
+        return lzma.decompress
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('Reading zstd containers requires the zstandard package')
+        return zstandard.ZstdDecompressor().decompress
+    raise ValueError(f'Unknown codec: {codec}')
+
+
+def is_container(path):
+    """Returns whether a file starts with the container magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ContainerWriter:
+    """
+    Writes raw (samples, 2) I/Q components into a block-compressed container.
+
+    The file is a small JSON header, then independently compressed blocks of
+    block_samples samples each, then an index of (first sample, file offset,
+    compressed size) per block and a fixed-size footer pointing at the
+    index. It is written in a single sequential pass.
+    """
+
+    def __init__(self, path, fmt, dtype, sample_rate, block_samples=1 << 20, codec='zlib', level=None):
+        self.compress = _compressor(codec, level)
+        self.dtype = np.dtype(dtype)
+        self.block_samples = block_samples
+        self.pending = []
+        self.pending_samples = 0
+        self.index = []
+        self.num_samples = 0
+
+        header = json.dumps({
+            'format': fmt,
+            'dtype': self.dtype.str,
+            'sample_rate': sample_rate,
+            'block_samples': block_samples,
+            'codec': codec,
+        }).encode()
+        self.f = open(path, 'wb')
+        self.f.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_block(self, raw):
+        data = self.compress(np.ascontiguousarray(raw, dtype=self.dtype))
+        self.index.append((self.num_samples, self.f.tell(), len(data)))
+        self.f.write(data)
+        self.num_samples += len(raw)
+
+    def write(self, raw):
+        """Appends samples, compressing every block as soon as it is complete."""
+        self.pending.append(raw)
+        self.pending_samples += len(raw)
+        if self.pending_samples < self.block_samples:
+            return
+        raw = np.concatenate(self.pending)
+        full = len(raw) - len(raw) % self.block_samples
+        for start in range(0, full, self.block_samples):
+            self._write_block(raw[start:start + self.block_samples])
+        self.pending = [raw[full:]]
+        self.pending_samples = len(raw) - full
+
+    def close(self):
+        if self.f.closed:
+            return
+        if self.pending_samples:
+            self._write_block(np.concatenate(self.pending))
+        index_offset = self.f.tell()
+        self.f.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.f.write(FOOTER.pack(index_offset, len(self.index), self.num_samples, MAGIC))
+        self.f.close()
+
+
+class IQContainer:
+    """
+    Read access to a block-compressed container.
+
+    Slicing returns raw (samples, 2) I/Q components, like a memory map of the
+    raw capture, but only the blocks that overlap the slice are read and
+    decompressed. The most recently decoded block is kept, so consecutive
+    chunks that share a block decode it once. The file stays open until
+    close(), or the end of a with block.
+    """
+
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        try:
+            self._read_header(path)
+        except BaseException:
+            self.f.close()
+            raise
+
+    def _read_header(self, path):
+        if self.f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not an IQ container')
+        header_size, = struct.unpack('<I', self.f.read(4))
+        header = json.loads(self.f.read(header_size))
+        self.fmt = header['format']
+        self.dtype = np.dtype(header['dtype'])
+        self.sample_rate = header['sample_rate']
+        self.block_samples = header['block_samples']
+        self.decompress = _decompressor(header['codec'])
+
+        self.f.seek(-FOOTER.size, 2)
+        index_offset, block_count, self.num_samples, magic = FOOTER.unpack(self.f.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is truncated: the container footer is missing')
+        self.f.seek(index_offset)
+        self.index = np.frombuffer(self.f.read(block_count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        self.cached_block = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.f.close()
+        self.cached_block = (None, None)
+
+    def __len__(self):
+        return self.num_samples
+
+    def block_at(self, sample):
+        """Returns the number of the block that holds a sample."""
+        return int(np.searchsorted(self.index['sample'], sample, side='right')) - 1
+
+    def read_block(self, block):
+        if self.cached_block[0] != block:
+            entry = self.index[block]
+            self.f.seek(int(entry['offset']))
+            data = self.decompress(self.f.read(int(entry['size'])))
+            self.cached_block = (block, np.frombuffer(data, dtype=self.dtype).reshape((-1, 2)))
+        return self.cached_block[1]
+
+    def __getitem__(self, key):
+        start, stop, step = key.indices(self.num_samples)
+        if step != 1:
+            raise ValueError('IQ containers only support contiguous slices')
+        if start >= stop:
+            return np.zeros((0, 2), dtype=self.dtype)
+        first, last = self.block_at(start), self.block_at(stop - 1)
+        parts = []
+        for block in range(first, last + 1):
+            block_start = int(self.index[block]['sample'])
+            raw = self.read_block(block)
+            parts.append(raw[max(start - block_start, 0):stop - block_start])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
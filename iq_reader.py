@@ -0,0 +1,303 @@
+import os
+import re
+import stat
+import time
+import contextlib
+import numpy as np
+from iq_container import IQContainer, is_container
+
+# Storage type of the I and Q components of each supported sample format,
+# with the value that maps to zero and the scale that maps full range to +/-1
+FORMATS = {
+    'cf32': (np.float32, 0.0, 1.0),  # complex64, as written by the GNU Radio File Sink
+    'cu8': (np.uint8, 127.5, 1 / 127.5),  # rtl_sdr raw dumps
+    'cs8': (np.int8, 0.0, 1 / 128),  # HackRF
+    'sc16': (np.int16, 0.0, 1 / 32768),  # 16-bit SDRs
+}
+
+
+def sample_size(fmt='cf32'):
+    """Returns the number of bytes per IQ sample in a format."""
+    return 2 * np.dtype(FORMATS[fmt][0]).itemsize
+
+
+def _is_container(path):
+    # Only regular files are probed, so no data is consumed from a pipe
+    return stat.S_ISREG(os.stat(path).st_mode) and is_container(path)
+
+
+def guess_format(path):
+    """
+    Guesses the sample format from a file extension such as .cu8, falling
+    back to cf32. Containers record their own format.
+    """
+    if _is_container(path):
+        with IQContainer(path) as container:
+            return container.fmt
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else 'cf32'
+
+
+def to_complex(raw, fmt='cf32', remove_dc=False):
+    """
+    Converts raw (samples, 2) I/Q components to complex64 in one vectorized pass.
+
+    With remove_dc the mean of I and Q over the block is subtracted in the
+    same pass, in place of the format's nominal zero, which removes the DC
+    spike of receivers such as the RTL-SDR.
+    """
+    if fmt == 'cf32' and not remove_dc:
+        return raw.view(np.complex64).reshape(-1)
+    _, zero, scale = FORMATS[fmt]
+    if remove_dc:
+        zero = raw.mean(axis=0)
+    chunk = np.empty(len(raw), dtype=np.complex64)
+    components = chunk.view(np.float32).reshape((-1, 2))
+    np.subtract(raw, zero, out=components, casting='unsafe')
+    if scale != 1.0:
+        components *= scale
+    return chunk
+
+
+def from_complex(chunk, fmt='cf32'):
+    """
+    Converts complex IQ data to raw (samples, 2) I/Q components of a format,
+    the inverse of to_complex. Integer formats are rounded and clipped to
+    their range.
+    """
+    chunk = np.asarray(chunk, dtype=np.complex64)
+    components = chunk.view(np.float32).reshape((-1, 2))
+    if fmt == 'cf32':
+        return components
+    dtype, zero, scale = FORMATS[fmt]
+    limits = np.iinfo(dtype)
+    return np.clip(np.rint(components / scale + zero), limits.min, limits.max).astype(dtype)
+
+
+def parse_time(text):
+    """
+    Parses a time such as 00:12:30, 12:30.5, 10s, 250ms or 10 into seconds.
+    """
+    match = re.fullmatch(r'\s*([0-9.]+)\s*(ms|s)?\s*', text)
+    if match:
+        return float(match.group(1)) / (1000 if match.group(2) == 'ms' else 1)
+    seconds = 0.0
+    for field in text.strip().split(':'):
+        if not re.fullmatch(r'[0-9]+(\.[0-9]*)?', field):
+            raise ValueError(f'Invalid time: {text}')
+        seconds = seconds * 60 + float(field)
+    return seconds
+
+
+def time_window(start=None, duration=None, sample_rate=2.048e6, path=None):
+    """
+    Converts optional start and duration strings to a (start, count) window
+    in samples. Containers record the rate they were captured at, so with
+    the path of one its rate is used instead of sample_rate.
+    """
+    if path is not None and (start or duration) and _is_container(path):
+        with IQContainer(path) as container:
+            sample_rate = container.sample_rate
+    first = int(round(parse_time(start) * sample_rate)) if start else 0
+    count = int(round(parse_time(duration) * sample_rate)) if duration else None
+    return first, count
+
+
+def open_iq(path, fmt='cf32'):
+    """
+    Opens an IQ capture as raw (samples, 2) I/Q components that are only
+    read when sliced. Raw captures are memory-mapped, so samples are only
+    paged in when they are touched, and block-compressed containers (see
+    iq_container) only decode the blocks a slice overlaps. A container keeps
+    its file open until it is closed; see opened_iq.
+    """
+    if _is_container(path):
+        container = IQContainer(path)
+        if container.fmt != fmt:
+            container.close()
+            raise ValueError(f'{path} holds {container.fmt} samples, not {fmt}')
+        return container
+    dtype = FORMATS[fmt][0]
+    count = os.path.getsize(path) // sample_size(fmt)
+    if count == 0:
+        return np.zeros((0, 2), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count, 2))
+
+
+@contextlib.contextmanager
+def opened_iq(path, fmt='cf32'):
+    """open_iq as a context manager, which closes a container's file at the end."""
+    iq_data = open_iq(path, fmt)
+    try:
+        yield iq_data
+    finally:
+        if isinstance(iq_data, IQContainer):
+            iq_data.close()
+
+
+def _window(iq_data, start, count):
+    stop = len(iq_data) if count is None else min(len(iq_data), start + count)
+    return start, max(stop, start)
+
+
+def num_chunks(path, chunk_size, fmt='cf32', start=0, count=None):
+    """Returns the number of complete chunks in an IQ capture, or in a window of it."""
+    if not stat.S_ISREG(os.stat(path).st_mode):
+        return 0
+    with opened_iq(path, fmt) as iq_data:
+        start, stop = _window(iq_data, start, count)
+    return (stop - start) // chunk_size
+
+
+def read_block(f, buffer):
+    """
+    Fills a preallocated array from a binary stream.
+    Returns the number of complete samples read, which is only short at EOF.
+    """
+    view = memoryview(buffer).cast('B')
+    filled = 0
+    while filled < len(view):
+        n = f.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled // (buffer.nbytes // len(buffer))
+
+
+def _skip(f, count, fmt, block_size=1 << 20):
+    # Pipes cannot seek, so samples before a window are read and dropped
+    raw = np.empty((min(count, block_size), 2), dtype=FORMATS[fmt][0])
+    while count > 0:
+        n = read_block(f, raw[:min(count, block_size)])
+        if not n:
+            return
+        count -= n
+
+
+def iter_blocks(path, block_size, fmt='cf32', remove_dc=False, start=0, count=None):
+    """
+    Yields consecutive blocks of up to block_size samples, including a final
+    short block, from the count samples (all by default) starting at start.
+    """
+    if stat.S_ISREG(os.stat(path).st_mode):
+        with opened_iq(path, fmt) as iq_data:
+            start, stop = _window(iq_data, start, count)
+            for offset in range(start, stop, block_size):
+                yield to_complex(iq_data[offset:min(offset + block_size, stop)], fmt, remove_dc)
+        return
+
+    with open(path, 'rb') as f:
+        _skip(f, start, fmt)
+        remaining = float('inf') if count is None else count
+        while remaining > 0:
+            block_size = int(min(block_size, remaining))
+            remaining -= block_size
+            raw = np.empty((block_size, 2), dtype=FORMATS[fmt][0])
+            n = read_block(f, raw)
+            if n:
+                yield to_complex(raw[:n], fmt, remove_dc)
+            if n < block_size:
+                return
+
+
+def iter_chunks(path, chunk_size, fmt='cf32', step=1, remove_dc=False, start=0, count=None, lazy=False):
+    """
+    Yields (index, chunk) for every step-th complete chunk of an IQ capture,
+    converted to complex64.
+
+    Regular files are memory-mapped and each chunk is converted from a view
+    into the map, so the capture is never loaded as a whole and the first
+    chunk is available immediately. Block-compressed containers are sliced
+    the same way and only decode the blocks each chunk overlaps. Pipes and
+    FIFOs cannot be mapped and are read in fixed-size blocks instead. A
+    trailing partial chunk is skipped, as before. See FORMATS for the
+    supported sample formats.
+
+    start and count select a window of the capture in samples; chunks are
+    then counted from the start of the window.
+
+    With lazy, each chunk is a function that reads and converts it when
+    called, so chunks that turn out not to be needed, such as ones whose
+    spectrum is cached, are never read from a regular file or container.
+    A container is closed once the chunks run out, so each function has to
+    be called before the next chunk is requested. Pipes are read either way.
+    """
+    if stat.S_ISREG(os.stat(path).st_mode):
+        with opened_iq(path, fmt) as iq_data:
+            start, stop = _window(iq_data, start, count)
+            for i in range(0, (stop - start) // chunk_size, step):
+                offset = start + i * chunk_size
+                # Containers decode a slice as soon as it is taken, so the slice is taken in read
+                read = lambda offset=offset: to_complex(iq_data[offset:offset + chunk_size], fmt, remove_dc)
+                yield i, read if lazy else read()
+        return
+
+    with open(path, 'rb') as f:
+        _skip(f, start, fmt)
+        i = 0
+        while count is None or (i + 1) * chunk_size <= count:
+            raw = np.empty((chunk_size, 2), dtype=FORMATS[fmt][0])
+            if read_block(f, raw) < chunk_size:
+                break
+            if i % step == 0:
+                chunk = to_complex(raw, fmt, remove_dc)
+                yield i, (lambda chunk=chunk: chunk) if lazy else chunk
+            i += 1
+
+
+def wait_for_file(path, poll=0.1, timeout=None):
+    """Waits until path exists, such as a capture that a recorder is about to create; returns whether it does."""
+    waited = 0.0
+    while not os.path.exists(path):
+        if timeout is not None and waited >= timeout:
+            return False
+        time.sleep(poll)
+        waited += poll
+    return True
+
+
+def follow_chunks(path, chunk_size, fmt='cf32', remove_dc=False, start=0, count=None, poll=0.1, timeout=None, sentinel=None):
+    """
+    Yields (index, chunk) for every complete chunk of a capture that is still
+    being written, such as by a GNU Radio File Sink, as soon as it lands.
+
+    The file is read once from start, keeping any partial chunk until the
+    rest arrives, so no sample is read twice. At the end of a regular file
+    it is polled every poll seconds for more samples. Following stops at the
+    end of the window (count samples), once the sentinel file exists and
+    every sample before it is read, after timeout seconds without new
+    samples, or on Ctrl-C while waiting. A FIFO is read until its writer
+    closes it. Containers cannot grow and are not supported.
+    """
+    if _is_container(path):
+        raise ValueError(f'{path} is a finished container; follow a raw capture instead')
+    dtype = FORMATS[fmt][0]
+    regular = stat.S_ISREG(os.stat(path).st_mode)
+    with open(path, 'rb') as f:
+        if regular:
+            f.seek(start * sample_size(fmt))
+        else:
+            _skip(f, start, fmt)
+        i = 0
+        last = time.monotonic()
+        while count is None or (i + 1) * chunk_size <= count:
+            raw = np.empty((chunk_size, 2), dtype=dtype)
+            view = memoryview(raw).cast('B')
+            filled = 0
+            while filled < len(view):
+                # The sentinel is checked before reading, so once it exists
+                # an empty read means that everything before it was read
+                finished = sentinel is not None and os.path.exists(sentinel)
+                n = f.readinto(view[filled:])
+                if n:
+                    filled += n
+                    last = time.monotonic()
+                    continue
+                if not regular or finished or (timeout is not None and time.monotonic() - last >= timeout):
+                    return
+                try:
+                    time.sleep(poll)
+                except KeyboardInterrupt:
+                    return
+            yield i, to_complex(raw, fmt, remove_dc)
+            i += 1
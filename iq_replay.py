@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from iq_reader import FORMATS, guess_format, parse_time, sample_size
+from socket_ingest import parse_address
+
+# Input frequency range in Hz (hertz)
+input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
+
+
+class Replay:
+    """
+    Streams a capture to every client of a socket at a fixed sample rate,
+    standing in for a GNU Radio TCP Sink or rtl_tcp, so socket ingest can be
+    tested over loopback without a receiver.
+
+    Samples are sent in packets of packet seconds, each one when it is due
+    at rate samples per second (as fast as possible with rate 0). Every
+    write waits until the socket has room, so a reader that falls behind
+    slows the replay down instead of losing samples; the time spent waiting
+    is counted as stalled. With rtl_tcp, a cu8 capture is preceded by the
+    12-byte rtl_tcp dongle info.
+    """
+
+    def __init__(self, path, rate=input_max, fmt='cf32', loop=False, packet=0.01, rtl_tcp=False):
+        self.path = path
+        self.rate = rate
+        self.fmt = fmt
+        self.loop = loop
+        self.packet_bytes = max(1, int(rate * packet)) * sample_size(fmt) if rate else 1 << 20
+        self.rtl_tcp = rtl_tcp
+        self.clients = 0
+        self.sent = 0  # bytes
+        self.stalled = 0.0  # seconds spent waiting for a slow reader
+        self.finished = None
+        # Set once the socket listens, for clients in other threads
+        self.listening = threading.Event()
+
+    async def send(self, writer):
+        """Streams the capture to one client."""
+        if self.rtl_tcp:
+            # 'RTL0', tuner type 5 (R820T) and 29 gain settings, big-endian
+            writer.write(b'RTL0' + (5).to_bytes(4, 'big') + (29).to_bytes(4, 'big'))
+        first = time.monotonic()
+        samples = 0
+        while True:
+            with open(self.path, 'rb') as f:
+                for packet in iter(lambda: f.read(self.packet_bytes), b''):
+                    if self.rate:
+                        delay = first + samples / self.rate - time.monotonic()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    writer.write(packet)
+                    clock = time.monotonic()
+                    await writer.drain()
+                    self.stalled += time.monotonic() - clock
+                    self.sent += len(packet)
+                    samples += len(packet) // sample_size(self.fmt)
+            if not self.loop:
+                return
+
+    async def handle(self, reader, writer):
+        self.clients += 1
+        try:
+            await self.send(writer)
+        except (ConnectionError, BrokenPipeError):
+            pass  # the client went away
+        finally:
+            writer.close()
+            self.finished.set()
+
+    async def serve(self, address, once=True):
+        """Serves the capture at a socket address; with once, until the first client is done."""
+        self.finished = asyncio.Event()
+        kind, host, port = parse_address(address)
+        if kind == 'tcp':
+            server = await asyncio.start_server(self.handle, host, port)
+        else:
+            if os.path.exists(host):
+                os.remove(host)
+            server = await asyncio.start_unix_server(self.handle, host)
+        async with server:
+            self.listening.set()
+            if once:
+                await self.finished.wait()
+            else:
+                await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay an IQ capture over a TCP or Unix socket at a fixed sample rate, for testing socket ingest.')
+    parser.add_argument('-i', '--input', default='input.bin', help='Capture to replay.')
+    parser.add_argument('-a', '--address', default='tcp://127.0.0.1:1234', help='Address to listen at, such as tcp://127.0.0.1:1234 or unix:///tmp/iq.sock.')
+    parser.add_argument('-f', '--format', dest='fmt', choices=sorted(FORMATS), help='Sample format of the capture; guessed from its extension by default.')
+    parser.add_argument('-r', '--rate', type=float, default=input_max, help='Samples per second to send, 0 for as fast as the reader takes them.')
+    parser.add_argument('--speed', type=float, default=1.0, help='Multiple of --rate to send at, such as 2 for twice real time.')
+    parser.add_argument('--packet', default='10ms', help='Length of capture sent at once.')
+    parser.add_argument('--loop', action='store_true', help='Start over at the end of the capture.')
+    parser.add_argument('--forever', action='store_true', help='Keep serving new clients instead of stopping after the first one.')
+    parser.add_argument('--rtl-tcp', action='store_true', help='Send the rtl_tcp dongle info first, as rtl_tcp does for cu8 samples.')
+    args = parser.parse_args()
+
+    replay = Replay(args.input, args.rate * args.speed, args.fmt or guess_format(args.input), args.loop, parse_time(args.packet), args.rtl_tcp)
+    clock = time.monotonic()
+    try:
+        asyncio.run(replay.serve(args.address, once=not args.forever))
+    except KeyboardInterrupt:
+        pass
+    seconds = time.monotonic() - clock
+    samples = replay.sent // sample_size(replay.fmt)
+    print(f'Sent {samples} samples to {replay.clients} client(s) in {seconds:.2f} s '
+          f'({samples / max(seconds, 1e-9) / 1e6:.2f} MS/s), waiting {replay.stalled:.2f} s for slow readers', file=sys.stderr)
@@ -0,0 +1,145 @@
+import collections
+import functools
+import numpy as np
+from parallel_render import render_parallel
+
+# Histogram range of log-PSD values: the 1e-6 floor puts the minimum at about
+# -13.8, and the PSD of a full-scale chunk of a million samples is near e^28
+SKETCH_MIN, SKETCH_MAX = -16.0, 64.0
+BINS_PER_UNIT = 100  # quantiles are resolved to 0.01 in log-PSD
+
+MODES = ('frame', 'running', 'rolling', 'global')
+
+
+def log_psd(fft_data):
+    """The log-PSD of a spectrum, as computed by the render scripts."""
+    return np.log(np.abs(fft_data) ** 2 + 1e-6)
+
+
+class LogSketch:
+    """
+    Mergeable summary of log-PSD values.
+
+    Keeps the exact minimum and maximum and, with histogram, the counts of
+    fixed-width bins, from which quantiles are read to within one bin. Two
+    sketches merge by adding their counts, so partial sketches from
+    different frames or worker processes combine into the same result as a
+    single sketch over all of the values.
+    """
+
+    def __init__(self, histogram=True):
+        self.min = np.inf
+        self.max = -np.inf
+        self.counts = np.zeros(int((SKETCH_MAX - SKETCH_MIN) * BINS_PER_UNIT), dtype=np.int64) if histogram else None
+
+    def add(self, values):
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+        if self.counts is not None:
+            bins = np.clip((values.ravel() - SKETCH_MIN) * BINS_PER_UNIT, 0, len(self.counts) - 1).astype(np.intp)
+            self.counts += np.bincount(bins, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.counts is not None:
+            self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        """Returns the q quantile, exactly for q = 0 and q = 1."""
+        if q <= 0:
+            return self.min
+        if q >= 1 or self.counts is None:
+            return self.max
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        edge = SKETCH_MIN + (index + 1) / BINS_PER_UNIT
+        return min(max(edge, self.min), self.max)
+
+
+def frame_sketch(i, fft_data, histogram=True):
+    """Summarizes the log-PSD of one spectrum; a render_frame for statistics passes."""
+    return LogSketch(histogram).add(log_psd(fft_data))
+
+
+class Normalizer:
+    """
+    Scales log-PSD values to 0-1 brightness consistently across frames,
+    instead of by each frame's own minimum and maximum.
+
+    running: the range of every frame so far, from a single pass.
+    rolling: the range of the last rolling_frames frames, from a single pass.
+    global: the range of the whole capture, set by fit() after a pre-pass.
+
+    The range runs from the low to the high percentile, so with percentiles
+    other than (0, 100) outliers are clipped. Running and rolling scales
+    depend on the frames before, so frames must be presented in order.
+    Values outside the range are clamped by the colorizer.
+    """
+
+    def __init__(self, mode='running', rolling_frames=30, percentiles=(0, 100)):
+        if mode not in MODES[1:]:
+            raise ValueError(f'Unknown normalization: {mode}')
+        self.mode = mode
+        self.rolling_frames = rolling_frames
+        self.percentiles = tuple(percentiles)
+        self.histogram = self.percentiles != (0, 100)
+        self.total = LogSketch(self.histogram)
+        self.recent = collections.deque(maxlen=rolling_frames)
+        self.last = None
+        self.range = None
+
+    def params(self):
+        """The settings that determine the scale, for the frame manifest."""
+        return {
+            'mode': self.mode,
+            'rolling_frames': self.rolling_frames if self.mode == 'rolling' else None,
+            'percentiles': list(self.percentiles),
+            'range': list(self.range) if self.mode == 'global' else None,
+        }
+
+    def _range(self, sketch):
+        low, high = self.percentiles
+        return sketch.quantile(low / 100), sketch.quantile(high / 100)
+
+    def fit(self, sketch):
+        """Fixes the global scale from a sketch of the whole capture."""
+        self.range = self._range(sketch)
+
+    def scale(self, i, values):
+        """Returns the (low, high) log-PSD range for frame i, whose log-PSD is values."""
+        if self.mode == 'global':
+            return self.range
+        # Styles rendered from the same frame share one update
+        if i != self.last:
+            self.last = i
+            sketch = LogSketch(self.histogram).add(values)
+            if self.mode == 'running':
+                self.total.merge(sketch)
+            else:
+                self.recent.append(sketch)
+                self.total = functools.reduce(LogSketch.merge, self.recent, LogSketch(self.histogram))
+            self.range = self._range(self.total)
+        return self.range
+
+    def normalize(self, i, values):
+        low, high = self.scale(i, values)
+        return (values - np.float32(low)) / np.float32(high - low or 1)
+
+
+def scan(spectra, histogram=True):
+    """Merges the log-PSD sketches of every (index, fft_data) of spectra."""
+    sketch = LogSketch(histogram)
+    for i, fft_data in spectra:
+        sketch.add(log_psd(fft_data))
+    return sketch
+
+
+def scan_parallel(path, chunk_size, processes=None, fmt='cf32', remove_dc=False, start=0, count=None, cache=None, histogram=True):
+    """Like scan over the chunks of a capture, with a process pool whose workers each send back one sketch per chunk."""
+    sketch = LogSketch(histogram)
+    render_parallel(path, chunk_size, functools.partial(frame_sketch, histogram=histogram), processes, fmt, remove_dc,
+                    start, count, cache=cache, collect=sketch.merge)
+    return sketch
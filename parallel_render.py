@@ -0,0 +1,191 @@
+import os
+import queue
+import threading
+import stat
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import scipy.fft
+from iq_reader import open_iq, num_chunks, iter_chunks, to_complex, sample_size
+import render_metrics
+
+# Per-process state set up once by the pool initializer
+_worker = {}
+
+
+def _init_worker(path, shm_name, chunk_size, render_frame, fmt, remove_dc, cache, measure=False):
+    if shm_name is None:
+        _worker['iq_data'] = open_iq(path, fmt)
+        _worker['convert'] = lambda raw: to_complex(raw, fmt, remove_dc)
+        _worker['read_bytes'] = chunk_size * sample_size(fmt)
+    else:
+        _worker['shm'] = shared_memory.SharedMemory(name=shm_name)
+        _worker['iq_data'] = np.ndarray((len(_worker['shm'].buf) // 8,), dtype=np.complex64, buffer=_worker['shm'].buf)
+        _worker['convert'] = lambda chunk: chunk
+        _worker['read_bytes'] = 0  # counted by the process that fills the ring
+    _worker['chunk_size'] = chunk_size
+    _worker['render_frame'] = render_frame
+    _worker['cache'] = cache
+
+    # Forked workers inherit the metrics of the parent, which are not theirs
+    render_metrics.current = render_metrics.RenderMetrics() if measure else render_metrics.NullMetrics()
+
+
+def _render_chunk(task):
+    i, offset = task
+    cache = _worker['cache']
+    metrics = render_metrics.current
+    fft_data = None if cache is None else cache.get(i)
+    if fft_data is None:
+        with metrics.stage('read'):
+            chunk = _worker['convert'](_worker['iq_data'][offset:offset + _worker['chunk_size']])
+        metrics.count('bytes_read', _worker['read_bytes'])
+        with metrics.stage('fft'):
+            fft_data = scipy.fft.fft(chunk)
+            if cache is not None:
+                cache.put(i, fft_data)
+    with metrics.stage('render'):
+        result = _worker['render_frame'](i, fft_data)
+    # What the worker measured travels back with the frame
+    return i, result, metrics.take() if metrics.enabled else None
+
+
+def _check_workers(workers):
+    # The pool replaces a worker that dies, but the chunk it was rendering
+    # is lost and its result never arrives
+    if not workers <= {process.pid for process in multiprocessing.active_children()}:
+        raise RuntimeError('A render worker exited unexpectedly, so its frame will never finish; it may have run out of memory')
+
+
+def _wait(get, empty, workers, timeout=1.0):
+    """Calls get(timeout) until it returns, checking in between that every worker is still alive."""
+    while True:
+        try:
+            return get(timeout=timeout)
+        except empty:
+            _check_workers(workers)
+
+
+def _start_pool(processes, initargs):
+    """Starts a worker pool and returns it with the process ids of its workers."""
+    before = {process.pid for process in multiprocessing.active_children()}
+    pool = multiprocessing.Pool(processes, _init_worker, initargs)
+    return pool, {process.pid for process in multiprocessing.active_children()} - before
+
+
+def render_parallel(path, chunk_size, render_frame, processes=None, fmt='cf32', remove_dc=False, start=0, count=None, skip=None, done=None, cache=None, collect=None, chunks=None):
+    """
+    Renders every chunk of an IQ capture in a process pool.
+
+    render_frame(i, fft_data) must be a module-level function that writes
+    frame i itself, so frames never travel back to this process. Only chunk
+    indices are sent to the workers: for regular files each worker reads its
+    chunk from its own memory map of the capture, while pipes and FIFOs are
+    read here into a ring of shared-memory slots that the workers view
+    directly. Raw samples are converted to complex64 by the workers in the
+    first case and by this process in the second. Frames complete out of order but keep their index in the
+    output file name.
+
+    start and count select a window of the capture in samples, as in
+    iq_reader.iter_chunks. Chunks for which skip(i) is true are not read or
+    rendered, and done(i) is called here as each frame is finished. Workers
+    take spectra from and add them to cache, as iter_spectra does. Whatever
+    render_frame returns is passed to collect(result) here, which lets the
+    workers send back small per-frame summaries. While render_metrics are
+    on, the workers measure their stages too and send the measurements back
+    with each frame.
+
+    chunks, an iterable of (i, chunk) such as iq_reader.follow_chunks,
+    replaces reading path; its chunks go through the shared-memory ring.
+
+    If a worker dies, for example killed for running out of memory, its
+    frame is lost, so a RuntimeError is raised instead of waiting for it.
+    """
+    skip = skip or (lambda i: False)
+    done = done or (lambda i: None)
+    collect = collect or (lambda result: None)
+
+    # Chunks handed to the workers and not finished yet, for the metrics
+    metrics = render_metrics.current
+    in_flight = 0
+    lock = threading.Lock()
+
+    def finished(i, result, measured):
+        nonlocal in_flight
+        if measured is not None:
+            metrics.merge(measured)
+        with lock:
+            in_flight -= 1
+            metrics.gauge('queue_depth', in_flight)
+        collect(result)
+        done(i)
+
+    def submitted(task):
+        nonlocal in_flight
+        with lock:
+            in_flight += 1
+            metrics.gauge('queue_depth', in_flight)
+        return task
+    processes = processes or os.cpu_count()
+
+    if chunks is None and stat.S_ISREG(os.stat(path).st_mode):
+        tasks = (submitted((i, start + i * chunk_size)) for i in range(num_chunks(path, chunk_size, fmt, start, count)) if not skip(i))
+        pool, workers = _start_pool(processes, (path, None, chunk_size, render_frame, fmt, remove_dc, cache, metrics.enabled))
+        with pool:
+            results = pool.imap_unordered(_render_chunk, tasks)
+            while True:
+                try:
+                    item = _wait(results.next, multiprocessing.TimeoutError, workers)
+                except StopIteration:
+                    break
+                finished(*item)
+        return
+
+    # Two slots per process keep every worker busy while the next chunk is read
+    slots = 2 * processes
+    shm = shared_memory.SharedMemory(create=True, size=slots * chunk_size * 8)
+    ring = np.ndarray((slots * chunk_size,), dtype=np.complex64, buffer=shm.buf)
+    try:
+        free_slots = queue.Queue()
+        for slot in range(slots):
+            free_slots.put(slot)
+        errors = []
+
+        def release(slot):
+            def callback(item):
+                finished(*item)
+                free_slots.put(slot)
+            return callback
+
+        def fail(slot):
+            def callback(error):
+                errors.append(error)
+                free_slots.put(slot)
+            return callback
+
+        pool, workers = _start_pool(processes, (path, shm.name, chunk_size, render_frame, fmt, remove_dc, cache, metrics.enabled))
+        with pool:
+            if chunks is None:
+                chunks = iter_chunks(path, chunk_size, fmt, remove_dc=remove_dc, start=start, count=count)
+            for i, chunk in metrics.timed(chunks, 'read'):
+                if skip(i):
+                    continue
+                metrics.count('bytes_read', chunk_size * sample_size(fmt))
+                slot = _wait(free_slots.get, queue.Empty, workers)
+                if errors:
+                    free_slots.put(slot)  # so the drain below gets every slot back
+                    break
+                ring[slot * chunk_size:(slot + 1) * chunk_size] = chunk
+                pool.apply_async(_render_chunk, (submitted((i, slot * chunk_size)),), callback=release(slot), error_callback=fail(slot))
+            # Every slot comes back once its frame is finished, or failed
+            for _ in range(slots):
+                _wait(free_slots.get, queue.Empty, workers)
+            pool.close()
+            pool.join()
+        if errors:
+            raise errors[0]
+    finally:
+        # The ring view must be released before the segment can be closed
+        del ring
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,119 @@
+import numpy as np
+import scipy.sparse
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mpl_toolkits.mplot3d import Axes3D
+
+
+def _decimate(values, mask, level):
+    """
+    Reduces a plane to level x level blocks, keeping the brightest selected
+    value of each block and whether any cell of the block was selected.
+    """
+    rows, cols = values.shape[0] // level, values.shape[1] // level
+    values = values[:rows * level, :cols * level].reshape((rows, level, cols, level))
+    mask = mask[:rows * level, :cols * level].reshape((rows, level, cols, level))
+    blocks = np.where(mask, values, -np.inf).max(axis=(1, 3))
+    return blocks, mask.any(axis=(1, 3))
+
+
+def _coarsen(points):
+    """Halves the resolution of a sparse slice, as _decimate would at twice its level."""
+    shape = (points.shape[0] // 2, points.shape[1] // 2)
+    rows, cols = points.row // 2, points.col // 2
+    inside = (rows < shape[0]) & (cols < shape[1])
+    rows, cols, data = rows[inside], cols[inside], points.data[inside]
+    if not len(data):
+        return scipy.sparse.coo_matrix(shape, dtype=np.float32)
+
+    # Keep the brightest point of every block
+    keys = rows.astype(np.int64) * shape[1] + cols
+    order = np.argsort(keys, kind='stable')
+    keys, data = keys[order], data[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    keys = keys[starts]
+    return scipy.sparse.coo_matrix((np.maximum.reduceat(data, starts), (keys // shape[1], keys % shape[1])), shape=shape)
+
+
+class PointCloud:
+    """
+    Time-stacked 3D scatter of frames with a fixed total point budget.
+
+    Each time slice keeps only the cells selected by its mask, stored as a
+    sparse COO matrix. A slice with more cells than its share of the budget
+    is coarsened level of detail style into 2x2, 4x4, ... blocks until it
+    fits, so memory and render time depend on the budget rather than on the
+    capture length.
+
+    When the number of slices is not known in advance (num_slices None),
+    such as for a FIFO, every slice starts with the whole budget, and the
+    slices kept so far are coarsened further whenever the cloud outgrows
+    it. With max_slices, every other slice is then dropped whenever there
+    are more, so the slices stay evenly spaced in time; takes(t) tells
+    whether the slice at time t would still be kept.
+    """
+
+    def __init__(self, point_budget, num_slices=None, max_slices=None):
+        self.point_budget = point_budget
+        self.num_slices = num_slices
+        self.max_slices = max_slices
+        self.slice_budget = max(1, point_budget // max(1, num_slices or 1))
+        self.stride = 1
+        self.slices = []
+
+    def __len__(self):
+        return sum(points.nnz for _, _, points in self.slices)
+
+    def takes(self, t):
+        """Tells whether a slice at time t is kept, which is always the case with a known number of slices."""
+        return t % self.stride == 0
+
+    def add_slice(self, t, values, mask=None):
+        """Adds the (size, size) plane of values at time t, keeping only the cells in mask."""
+        if not self.takes(t):
+            return
+        if mask is None:
+            mask = np.ones(values.shape, dtype=bool)
+        level = 1
+        plane, keep = values, mask
+        while np.count_nonzero(keep) > self.slice_budget:
+            level *= 2
+            plane, keep = _decimate(values, mask, level)
+        rows, cols = np.nonzero(keep)
+        points = scipy.sparse.coo_matrix((plane[rows, cols].astype(np.float32), (rows, cols)), shape=plane.shape)
+        self.slices.append((t, level, points))
+        if self.num_slices is None:
+            self._rebalance()
+
+    def _rebalance(self):
+        # Keep every other slice once there are too many
+        if self.max_slices and len(self.slices) > self.max_slices:
+            self.stride *= 2
+            self.slices = [item for item in self.slices if self.takes(item[0])]
+
+        # Share the budget among the slices so far, coarsening the ones over their share
+        if len(self) > self.point_budget:
+            self.slice_budget = max(1, self.point_budget // len(self.slices))
+            for n, (t, level, points) in enumerate(self.slices):
+                while points.nnz > self.slice_budget:
+                    level *= 2
+                    points = _coarsen(points)
+                self.slices[n] = (t, level, points)
+
+    def render(self, output_file, cmap='viridis', marker_size=1, dpi=150):
+        """Draws every slice into a single scatter plot and saves it without opening a window."""
+        x, y, z, c, s = [], [], [], [], []
+        for t, level, points in self.slices:
+            # Place coarsened points at the centre of their block, drawn larger
+            x.append(points.col * level + (level - 1) / 2)
+            y.append(points.row * level + (level - 1) / 2)
+            z.append(np.full(points.nnz, t))
+            c.append(points.data)
+            s.append(np.full(points.nnz, marker_size * level**2))
+
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111, projection='3d')
+        if self.slices:
+            ax.scatter(np.concatenate(x), np.concatenate(y), np.concatenate(z), c=np.concatenate(c), s=np.concatenate(s), cmap=cmap)
+        fig.savefig(output_file, dpi=dpi)
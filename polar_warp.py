@@ -0,0 +1,63 @@
+import functools
+import numpy as np
+import scipy.sparse
+from scipy.spatial import Delaunay
+
+
+def polar_coordinates(size):
+    """Returns the (R, Theta) planes of a size x size grid spanning [-1, 1]."""
+    X, Y = np.meshgrid(np.linspace(-1, 1, size), np.linspace(-1, 1, size))
+    return np.sqrt(X**2 + Y**2), np.arctan2(Y, X)
+
+
+class PolarWarp:
+    """
+    Resamples frames from the (R, Theta) scatter of a size x size grid onto
+    an out_size x out_size polar grid.
+
+    scipy.interpolate.griddata triangulates the same scattered points on
+    every call. Here the Delaunay triangulation is built once and every
+    output pixel's barycentric weights on its enclosing triangle are stored
+    as a sparse matrix, so warping a frame is a single sparse product over
+    all channels. At out_size == size the output pixels fall on the input
+    points, where this matches the cubic griddata result to within
+    floating-point error. Pixels outside the triangulation are NaN, as with
+    griddata.
+    """
+
+    def __init__(self, size, out_size=None):
+        self.size = size
+        self.out_size = out_size or size
+
+        R, Theta = polar_coordinates(size)
+        points = np.column_stack((R.ravel(), Theta.ravel()))
+        R_out, Theta_out = polar_coordinates(self.out_size)
+        query = np.column_stack((R_out.ravel(), Theta_out.ravel()))
+
+        triangulation = Delaunay(points)
+        simplex = triangulation.find_simplex(query)
+        self.outside = simplex == -1
+
+        # Barycentric coordinates of every query point in its triangle
+        transform = triangulation.transform[simplex]
+        barycentric = np.einsum('nij,nj->ni', transform[:, :2], query - transform[:, 2])
+        weights = np.column_stack((barycentric, 1 - barycentric.sum(axis=1)))
+        weights[self.outside] = 0
+
+        rows = np.repeat(np.arange(len(query)), 3)
+        columns = triangulation.simplices[simplex].ravel()
+        self.matrix = scipy.sparse.csr_matrix((weights.ravel(), (rows, columns)), shape=(len(query), len(points)))
+
+    def apply(self, image_data):
+        """Warps a (size, size) or (size, size, channels) frame."""
+        channels = image_data.shape[2:]
+        values = image_data.reshape((self.size**2, -1))
+        polar_image_data = self.matrix @ values
+        polar_image_data[self.outside] = np.nan
+        return polar_image_data.reshape((self.out_size, self.out_size) + channels)
+
+
+@functools.lru_cache(maxsize=None)
+def get_polar_warp(size, out_size=None):
+    """Returns the shared PolarWarp for a (size, output resolution) pair."""
+    return PolarWarp(size, out_size)
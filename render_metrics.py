@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def max_rss():
+    """Returns the peak resident set size of this process in bytes, or None where unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB and macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class NullMetrics:
+    """Stands in for RenderMetrics when metrics are off; every call does nothing."""
+
+    enabled = False
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def timed(self, iterable, name):
+        return iterable
+
+    def count(self, name, value=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def maybe_flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Stage:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics._enter(self.name)
+
+    def __exit__(self, *exc_info):
+        self.metrics._exit()
+
+
+class RenderMetrics:
+    """
+    Wall and CPU time per render stage, counters and gauges of a render.
+
+    Stage times are exclusive: while a stage runs inside another, such as
+    the PNG encode inside a render, the outer stage's clocks stop, so the
+    stage times add up to the time spent in stages. Worker processes keep
+    their own RenderMetrics and send back what they measured with each
+    frame (take and merge), so their stage times are summed over processes.
+    Merges may come from a pool's result thread, so updates are locked.
+
+    Every interval seconds, maybe_flush rewrites textfile in the Prometheus
+    text exposition format, as read by the node_exporter textfile collector,
+    and appends a snapshot to the JSON-lines log.
+    """
+
+    enabled = True
+
+    def __init__(self, textfile=None, log=None, interval=10.0, labels=None):
+        self.textfile = textfile
+        self.log = log
+        self.interval = interval
+        self.labels = labels or {}
+        self.stages = {}  # name: [wall seconds, cpu seconds, calls]
+        self.counters = {}
+        self.gauges = {}
+        self.worker_rss = None
+        self._stack = []
+        self._lock = threading.Lock()
+        self._wall = self._cpu = 0.0
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self._flushed = self._clock
+
+    def _switch(self):
+        # Charges the time since the last switch to the innermost stage
+        wall, cpu = time.perf_counter(), time.process_time()
+        with self._lock:
+            if self._stack:
+                totals = self.stages[self._stack[-1]]
+                totals[0] += wall - self._wall
+                totals[1] += cpu - self._cpu
+            self._wall, self._cpu = wall, cpu
+
+    def _enter(self, name):
+        self._switch()
+        self._stack.append(name)
+        self.stages.setdefault(name, [0.0, 0.0, 0])[2] += 1
+
+    def _exit(self):
+        self._switch()
+        self._stack.pop()
+
+    def stage(self, name):
+        """Context manager that times its body as the named stage."""
+        return _Stage(self, name)
+
+    def timed(self, iterable, name):
+        """Yields the items of iterable, timing the production of each one as the named stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def take(self):
+        """Returns and resets what was measured since the last take, for merge in another process."""
+        self._switch()
+        with self._lock:
+            delta = {'stages': self.stages, 'counters': self.counters, 'rss': max_rss()}
+            self.stages = {name: [0.0, 0.0, 0] for name in self._stack}
+            self.counters = {}
+        return delta
+
+    def merge(self, delta):
+        with self._lock:
+            for name, (wall, cpu, calls) in delta['stages'].items():
+                totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+                totals[0] += wall
+                totals[1] += cpu
+                totals[2] += calls
+            for name, value in delta['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            if delta['rss'] is not None:
+                self.worker_rss = max(self.worker_rss or 0, delta['rss'])
+
+    def snapshot(self):
+        """Returns everything measured so far as a JSON-serializable dict."""
+        self._switch()
+        elapsed = time.perf_counter() - self._clock
+        return {
+            'time': time.time(),
+            'started': self.started,
+            'elapsed': elapsed,
+            'labels': self.labels,
+            'stages': {name: {'wall': wall, 'cpu': cpu, 'calls': calls} for name, (wall, cpu, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'frames_per_second': self.counters.get('frames', 0) / elapsed if elapsed else 0.0,
+            'samples_per_second': self.counters.get('samples', 0) / elapsed if elapsed else 0.0,
+            'rss_max_bytes': max_rss(),
+            'worker_rss_max_bytes': self.worker_rss,
+        }
+
+    def flush(self):
+        snapshot = self.snapshot()
+        if self.textfile:
+            # Written to a temporary file and renamed, so a scrape never sees half a file
+            temporary = f'{self.textfile}.{os.getpid()}.tmp'
+            with open(temporary, 'w') as f:
+                f.write(to_prometheus(snapshot))
+            os.replace(temporary, self.textfile)
+        if self.log:
+            with open(self.log, 'a') as f:
+                f.write(json.dumps(snapshot) + '\n')
+        self._flushed = time.perf_counter()
+
+    def maybe_flush(self):
+        """Flushes if interval seconds have passed since the last flush."""
+        if time.perf_counter() - self._flushed >= self.interval:
+            self.flush()
+
+    def close(self):
+        self.flush()
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}' if labels else ''
+
+
+def to_prometheus(snapshot, prefix='radio_waves'):
+    """Formats a RenderMetrics snapshot in the Prometheus text exposition format."""
+    labels = snapshot['labels']
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {prefix}_{name} {help_text}')
+        lines.append(f'# TYPE {prefix}_{name} {kind}')
+        for extra, value in samples:
+            if value is not None:
+                lines.append(f'{prefix}_{name}{_labels({**labels, **extra})} {value}')
+
+    stages = snapshot['stages']
+    metric('stage_seconds_total', 'counter', 'Time spent in each render stage, summed over processes.',
+           [({'stage': name, 'clock': clock}, totals[clock]) for name, totals in stages.items() for clock in ('wall', 'cpu')])
+    metric('stage_calls_total', 'counter', 'Number of times each render stage ran.',
+           [({'stage': name}, totals['calls']) for name, totals in stages.items()])
+    for name, value in sorted(snapshot['counters'].items()):
+        metric(f'{name}_total', 'counter', f'Total {name.replace("_", " ")} of the render.', [({}, value)])
+    for name, value in sorted(snapshot['gauges'].items()):
+        metric(name, 'gauge', f'Current {name.replace("_", " ")}.', [({}, value)])
+    metric('frames_per_second', 'gauge', 'Frames rendered per second since the render started.', [({}, snapshot['frames_per_second'])])
+    metric('samples_per_second', 'gauge', 'Capture samples rendered per second since the render started.', [({}, snapshot['samples_per_second'])])
+    metric('rss_max_bytes', 'gauge', 'Peak resident set size.',
+           [({'process': 'main'}, snapshot['rss_max_bytes']), ({'process': 'worker'}, snapshot['worker_rss_max_bytes'])])
+    metric('elapsed_seconds', 'gauge', 'Seconds since the render started.', [({}, snapshot['elapsed'])])
+    metric('start_time_seconds', 'gauge', 'Unix time the render started at.', [({}, snapshot['started'])])
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics of the render running in this process; render_capture and the
+# worker processes replace it while metrics are on
+current = NullMetrics()
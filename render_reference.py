@@ -0,0 +1,139 @@
+import numpy as np
+from scipy.fft import fft
+from scipy.interpolate import griddata
+import matplotlib.colors
+from skimage.color import rgb2gray
+
+# Visible light frequency range in THz (terahertz)
+visible_light_min = 430  # THz
+visible_light_max = 790  # THz
+
+# Input frequency range in Hz (hertz)
+input_min = 0  # Hz
+input_max = 2.048e6  # Hz, assuming RTL-SDR is sampling at 2.4 MHz
+
+# The original per-frame rendering of every style, step by step as the
+# scripts did it before any fast path, for checking the fast paths against.
+# Only the plt.imshow + plt.savefig at the end is left out: it resamples the
+# frame to the figure size, so each function returns the float image that
+# was shown instead, at its native resolution.
+
+
+def to_visible_light(input_frequency, input_max=input_max):
+    """Maps an input frequency to the visible light frequency range."""
+    m = (visible_light_max - visible_light_min) / (input_max - input_min)
+    b = visible_light_min - m * input_min
+    return m * input_frequency + b
+
+
+def _hue(chunk, sample_rate):
+    frequencies = np.fft.fftfreq(len(chunk)) * sample_rate
+
+    # Apply the transformation to each frequency
+    visible_light_frequencies = to_visible_light(np.abs(frequencies), sample_rate)
+
+    # Normalizing frequencies to 0-1 range for color mapping
+    return (visible_light_frequencies - np.min(visible_light_frequencies)) / np.ptp(visible_light_frequencies)
+
+
+def _normalized_log_psd(fft_data):
+    # Compute the power spectral density (PSD)
+    psd = np.abs(fft_data) ** 2
+
+    # Apply a logarithmic scale to the PSD to compress the dynamic range,
+    # then normalize it for brightness adjustment. Adding a small constant
+    # to avoid taking the logarithm of zero.
+    log_psd = np.log(psd + 1e-6)
+    return (log_psd - np.min(log_psd)) / (np.max(log_psd) - np.min(log_psd))
+
+
+def _hsv_image(normalized_frequencies, brightness):
+    # Combine frequency and brightness information
+    image_data = np.zeros((len(normalized_frequencies), 3))
+    image_data[:, 0] = normalized_frequencies  # Color (hue)
+    image_data[:, 1] = 1.0  # Saturation
+    image_data[:, 2] = brightness  # Brightness
+
+    # Reshaping the frequency array into 2D format
+    size = int(np.sqrt(normalized_frequencies.shape[0]))
+    return image_data[:size**2, :].reshape((size, size, 3)), size
+
+
+def _static(rgb_image_data, normalized_psd, size, threshold):
+    # Convert to grayscale and then back to RGB for static
+    gray_image_data = rgb2gray(rgb_image_data)
+    static_rgb_image_data = np.dstack([gray_image_data]*3)
+
+    # Reshape normalized_psd to match image_data dimensions
+    normalized_psd = normalized_psd[:size**2].reshape((size, size))
+
+    # Replace RGB image data with static data for low PSD values
+    rgb_image_data[normalized_psd < threshold] = static_rgb_image_data[normalized_psd < threshold]
+    return rgb_image_data
+
+
+def log_psd_frame(chunk, sample_rate=input_max):
+    """freq2light_LOG_PSD.py"""
+    normalized_psd = _normalized_log_psd(fft(chunk))
+    image_data, _ = _hsv_image(_hue(chunk, sample_rate), normalized_psd)
+    return matplotlib.colors.hsv_to_rgb(image_data)
+
+
+def static_frame(chunk, sample_rate=input_max):
+    """freq2light_staticgrayscale_LOG_PSD.py"""
+    normalized_psd = _normalized_log_psd(fft(chunk))
+    image_data, size = _hsv_image(_hue(chunk, sample_rate), normalized_psd)
+    return _static(matplotlib.colors.hsv_to_rgb(image_data), normalized_psd, size, 0.6)
+
+
+def rgba_frame(chunk, sample_rate=input_max):
+    """RGBA_freq_to_light.py"""
+    fft_data = fft(chunk)
+
+    # Compute the phase and normalize it
+    phase = np.angle(fft_data) / (2 * np.pi)  # Normalize phase to 0-1 range
+    normalized_psd = _normalized_log_psd(fft_data)
+    image_data, size = _hsv_image(_hue(chunk, sample_rate), normalized_psd)
+
+    # Create an RGBA image
+    rgba_image_data = np.zeros((size, size, 4))
+    rgba_image_data[:, :, :3] = matplotlib.colors.hsv_to_rgb(image_data)
+    rgba_image_data[:, :, 3] = phase[:size**2].reshape((size, size))  # Phase
+    return rgba_image_data
+
+
+def magnitude_frame(chunk, sample_rate=input_max):
+    """freq2light_Magnitude_Norm.py"""
+    fft_data = fft(chunk)
+
+    # Compute the magnitude of the FFT data and normalize it for brightness adjustment
+    normalized_magnitude = np.abs(fft_data) / np.max(np.abs(fft_data))
+    image_data, _ = _hsv_image(_hue(chunk, sample_rate), normalized_magnitude)
+    return matplotlib.colors.hsv_to_rgb(image_data)
+
+
+def polar_frame(chunk, sample_rate=input_max):
+    """freq2light_polar_LOG_PSD.py; slow, as griddata triangulates every channel of every frame."""
+    normalized_psd = _normalized_log_psd(fft(chunk))
+    image_data, size = _hsv_image(_hue(chunk, sample_rate), normalized_psd)
+    rgb_image_data = _static(matplotlib.colors.hsv_to_rgb(image_data), normalized_psd, size, 0.1)
+
+    # Create polar coordinates and perform interpolation
+    X, Y = np.meshgrid(np.linspace(-1, 1, size), np.linspace(-1, 1, size))
+    R = np.sqrt(X**2 + Y**2)
+    Theta = np.arctan2(Y, X)
+
+    polar_image_data = np.zeros((size, size, 3))
+    for channel in range(3):
+        polar_image_data[..., channel] = griddata((R.flatten(), Theta.flatten()), rgb_image_data[..., channel].flatten(), (R, Theta), method='cubic')
+    return polar_image_data
+
+
+# Reference frame of every style, by the style names of freq2light_all_styles
+REFERENCES = {
+    'LOG_PSD': log_psd_frame,
+    'static': static_frame,
+    'RGBA': rgba_frame,
+    'Mag_Norm': magnitude_frame,
+    'polar': polar_frame,
+}
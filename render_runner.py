@@ -0,0 +1,359 @@
+import os
+import functools
+import contextlib
+import dataclasses
+from iq_reader import FORMATS, follow_chunks, wait_for_file, guess_format, iter_blocks, iter_chunks, sample_size, time_window
+from fft_planner import plan_chunk_size
+from fft_engine import iter_spectra, iter_stft
+from parallel_render import render_parallel
+from frame_manifest import FrameManifest, render_params
+from spectrum_cache import SpectrumCache
+from normalization import MODES, Normalizer, scan, scan_parallel
+from socket_ingest import OVERFLOW_MODES, SocketIngest, is_address
+import render_metrics
+
+
+@dataclasses.dataclass
+class RenderOptions:
+    """
+    The options shared by the 2D renderers, named as their add_arguments
+    destinations. See render_capture for what they do.
+    """
+    processes: int = 1
+    fmt: str = None
+    remove_dc: bool = False
+    start: str = None
+    duration: str = None
+    fps: float = None
+    window: str = 'boxcar'
+    autotune: bool = False
+    cache: bool = False
+    cache_size: float = 4
+    normalization: str = 'frame'
+    rolling_frames: int = 30
+    percentiles: tuple = (0, 100)
+    follow: bool = False
+    follow_timeout: float = None
+    follow_sentinel: str = None
+    buffer_chunks: int = 4
+    overflow: str = 'block'
+    metrics_textfile: str = None
+    metrics_log: str = None
+    metrics_interval: float = 10
+
+    @classmethod
+    def from_args(cls, args):
+        """Takes the render options from parsed arguments, leaving out others such as the input."""
+        return cls(**{field.name: getattr(args, field.name) for field in dataclasses.fields(cls) if hasattr(args, field.name)})
+
+
+def add_arguments(parser):
+    """Adds the options shared by the 2D renderers, whose destinations are the fields of RenderOptions."""
+    defaults = RenderOptions()
+    parser.add_argument('-p', '--processes', type=int, default=defaults.processes, help='Number of render processes, 0 for one per CPU core.')
+    parser.add_argument('-f', '--format', dest='fmt', choices=sorted(FORMATS), help='Sample format of the input; guessed from its extension by default, otherwise cf32.')
+    parser.add_argument('--remove-dc', action='store_true', help='Subtract the DC offset of every chunk.')
+    parser.add_argument('--start', help='Time to start rendering at, such as 00:12:30 or 750s.')
+    parser.add_argument('--duration', help='Length of capture to render, such as 10s; to the end by default.')
+    parser.add_argument('--fps', type=float, help='Frames per second of capture from overlapping windows; one frame per chunk by default. Rendered in this process.')
+    parser.add_argument('--window', default=defaults.window, help='Analysis window for --fps, such as hann; any scipy.signal.get_window name.')
+    parser.add_argument('--autotune', action='store_true', help='Use the fastest nearby FFT length that fills the frame exactly.')
+    parser.add_argument('--cache', action='store_true', help='Share spectra between render styles through the on-disk spectrum cache.')
+    parser.add_argument('--cache-size', type=float, default=defaults.cache_size, help='Largest size of the spectrum cache in GiB.')
+    parser.add_argument('--normalize', dest='normalization', choices=MODES, default=defaults.normalization,
+                        help='Brightness scale: per frame (default), running over all frames so far, rolling over recent frames, or global over the capture.')
+    parser.add_argument('--rolling-frames', type=int, default=defaults.rolling_frames, help='Number of frames in the rolling scale.')
+    parser.add_argument('--percentiles', type=float, nargs=2, default=defaults.percentiles, metavar=('LOW', 'HIGH'),
+                        help='Log-PSD percentiles that map to black and full brightness with --normalize, clipping outliers.')
+    parser.add_argument('--follow', action='store_true', help='Keep rendering a capture that is still being written, such as by a GNU Radio File Sink, frame by frame as each chunk lands.')
+    parser.add_argument('--follow-timeout', type=float, help='With --follow, stop after this many seconds without new samples; by default follow until Ctrl-C.')
+    parser.add_argument('--follow-sentinel', help='With --follow, stop once this file exists and the capture is read to its end.')
+    parser.add_argument('--buffer-chunks', type=int, default=defaults.buffer_chunks, help='With a tcp:// or unix:// input, number of chunks buffered between the socket and the renderer.')
+    parser.add_argument('--overflow', choices=OVERFLOW_MODES, default=defaults.overflow,
+                        help='With a tcp:// or unix:// input, when the buffer is full: block the sender until rendering catches up, or drop whole chunks.')
+    parser.add_argument('--metrics-textfile', help='Keep render metrics in this Prometheus textfile, such as for the node_exporter textfile collector.')
+    parser.add_argument('--metrics-log', help='Append render metrics to this JSON-lines file.')
+    parser.add_argument('--metrics-interval', type=float, default=defaults.metrics_interval, help='Seconds between metrics updates.')
+
+
+@contextlib.contextmanager
+def exit_on_missing_input(parser):
+    """
+    Ends a render script with a one-line message instead of a traceback
+    when its input does not exist, or a followed capture never appears.
+    """
+    try:
+        yield
+    except FileNotFoundError as error:
+        parser.exit(1, f'{parser.prog}: {error}\n')
+
+
+def render_styles(render_frames, i, fft_data, normalizer=None):
+    """Renders the spectrum of chunk i with every render_frame."""
+    for render_frame in render_frames:
+        if normalizer is None:
+            render_frame(i, fft_data)
+        else:
+            render_frame(i, fft_data, normalizer)
+
+
+def _chunk_samples(item):
+    # Number of samples in an (index, chunk) pair
+    return len(item[1])
+
+
+def render_capture(input_file, styles, sample_rate, chunk_size, options=None, **overrides):
+    """
+    Reads, transforms and renders a capture in one or more styles.
+
+    styles is a list of (render_frame, directory, layout), where
+    render_frame(i, fft_data[, normalizer]) writes frame i into directory.
+    options is a RenderOptions, the defaults by default, and keyword
+    overrides such as processes=2 replace its fields. Every chunk is read
+    and transformed once, however many styles there are, serially in
+    batches, in a process pool (processes != 1) or as overlapping analysis
+    windows (fps). Each directory keeps a frame manifest, so frames that an
+    earlier run already rendered are skipped.
+
+    With follow, the capture may still be growing: chunks are rendered one
+    at a time as they land (see iq_reader.follow_chunks), until follow_timeout
+    seconds pass without new samples, the follow_sentinel file appears, the
+    writer of a FIFO closes it or Ctrl-C.
+
+    input_file may also be a socket address such as tcp://127.0.0.1:1234 or
+    unix:///tmp/iq.sock, which is streamed like a followed capture until
+    the sender closes it. Up to buffer_chunks chunks wait between the socket
+    and the renderer; when they are full, overflow either blocks the sender
+    or drops whole chunks (see socket_ingest.SocketIngest).
+
+    With metrics_textfile or metrics_log, the read, fft, render, encode and
+    write stages are timed and the render's progress is written out every
+    metrics_interval seconds (see render_metrics). Otherwise no measuring
+    is done.
+    """
+    options = dataclasses.replace(options or RenderOptions(), **overrides)
+    metrics = render_metrics.NullMetrics()
+    if options.metrics_textfile or options.metrics_log:
+        metrics = render_metrics.RenderMetrics(options.metrics_textfile, options.metrics_log, options.metrics_interval,
+                                               {'input': os.path.basename(input_file), 'styles': ','.join(d for _, d, _ in styles)})
+    render_metrics.current = metrics
+    try:
+        CaptureRender(input_file, styles, sample_rate, chunk_size, options, metrics).run()
+    finally:
+        render_metrics.current = render_metrics.NullMetrics()
+        metrics.close()
+
+
+class CaptureRender:
+    """
+    A single render of a capture with RenderOptions. The options are
+    checked and resolved against the input up front; run then scans the
+    capture for a global scale if needed and renders it through one of the
+    live, STFT, process pool or serial passes.
+    """
+
+    def __init__(self, input_file, styles, sample_rate, chunk_size, options, metrics):
+        self.input_file = input_file
+        self.styles = styles
+        self.sample_rate = sample_rate
+        self.options = options
+        self.metrics = metrics
+
+        # A socket is streamed like a followed capture, and has no extension
+        # to guess its format from
+        self.stream = is_address(input_file)
+        self.live = options.follow or self.stream
+        if self.stream and options.fps and options.overflow == 'drop':
+            raise ValueError('--fps windows span consecutive chunks, so they cannot skip dropped ones; use --overflow block')
+        if options.normalization in ('running', 'rolling') and options.processes != 1 and not options.fps:
+            raise ValueError(f'{options.normalization} normalization needs the frames in order; use one process')
+        if options.normalization == 'global' and self.live:
+            raise ValueError('global normalization needs the whole capture up front; use running or rolling with --follow')
+        if options.follow and not self.stream:
+            # The recorder may not have created the capture yet
+            if not wait_for_file(input_file, timeout=options.follow_timeout):
+                raise FileNotFoundError(f'{input_file} did not appear within {options.follow_timeout:g} s')
+
+        # Sample format of the capture
+        self.fmt = options.fmt or ('cf32' if self.stream else guess_format(input_file))
+
+        # Window of the capture to render, in samples
+        self.start, self.count = time_window(options.start, options.duration, sample_rate, None if self.stream else input_file)
+
+        if options.autotune:
+            # Use the nearby chunk size with the fastest FFT that fills the frame
+            # exactly, benchmarked once on this host and kept in the wisdom file.
+            # Only square frames suit a mix of layouts.
+            layouts = {layout for _, _, layout in styles}
+            chunk_size = plan_chunk_size(chunk_size, layouts.pop() if len(layouts) == 1 else 'square')
+        self.chunk_size = chunk_size
+
+        # Frames advance by one chunk, or by the hop between analysis windows
+        self.hop = max(1, int(round(sample_rate / options.fps))) if options.fps else chunk_size
+
+        # Reuse the spectra that any render style already computed from the same
+        # samples, and keep the new ones for the other styles. A growing
+        # capture changes its fingerprint with every write, so while following
+        # one its spectra could never be found again and are not kept. The
+        # phase is only kept for styles that mark their render_frame with
+        # uses_phase.
+        self.spectra = None
+        if options.cache and not self.live:
+            phase = any(getattr(render_frame, 'uses_phase', False) for render_frame, _, _ in styles)
+            self.spectra = SpectrumCache(max_bytes=int(options.cache_size * 2**30)).bind(
+                input_file, self.start, self.hop, chunk_size, phase, fmt=self.fmt, remove_dc=options.remove_dc,
+                window=options.window if options.fps else None)
+
+        self.normalizer = None
+        if options.normalization != 'frame':
+            self.normalizer = Normalizer(options.normalization, options.rolling_frames, options.percentiles)
+        self.manifests = []
+
+        # Chunks and blocks are counted as they are read
+        self.read_bytes = sample_size(self.fmt)
+
+    def run(self):
+        options = self.options
+        if options.normalization == 'global':
+            self.scan_global()
+        self.open_manifests()
+
+        # A partial of a module-level function can be sent to worker processes
+        self.render = functools.partial(render_styles, tuple(render_frame for render_frame, _, _ in self.styles), normalizer=self.normalizer)
+
+        if self.live:
+            self.render_live()
+        elif options.fps:
+            self.render_stft()
+        elif options.processes != 1:
+            self.render_pool()
+        else:
+            self.render_serial()
+
+    def scan_global(self):
+        """
+        Scans the capture for its log-PSD statistics before rendering; with
+        the spectrum cache, the render pass then reads the spectra back from
+        the cache instead of transforming them again.
+        """
+        options = self.options
+        self.metrics.gauge('scanning', 1)
+        histogram = self.normalizer.histogram
+        if options.fps:
+            blocks = iter_blocks(self.input_file, self.chunk_size, self.fmt, options.remove_dc, self.start, self.count)
+            sketch = scan(iter_stft(blocks, self.chunk_size, self.hop, options.window, cache=self.spectra), histogram)
+        elif options.processes != 1:
+            sketch = scan_parallel(self.input_file, self.chunk_size, options.processes or None, self.fmt, options.remove_dc, self.start,
+                                   self.count, self.spectra, histogram)
+        else:
+            chunks = iter_chunks(self.input_file, self.chunk_size, self.fmt, remove_dc=options.remove_dc, start=self.start, count=self.count,
+                                 lazy=True)
+            sketch = scan(iter_spectra(chunks, self.chunk_size, cache=self.spectra), histogram)
+        self.normalizer.fit(sketch)
+        self.metrics.gauge('scanning', 0)
+
+    def open_manifests(self):
+        """Opens the frame manifest of every output directory, creating the directories."""
+        options = self.options
+        for render_frame, directory, layout in self.styles:
+            os.makedirs(directory, exist_ok=True)
+            params = render_params(render_frame, sample_rate=self.sample_rate, chunk_size=self.chunk_size, fmt=self.fmt,
+                                   remove_dc=options.remove_dc, layout=layout, window=options.window if options.fps else None)
+            if self.normalizer is not None:
+                params['normalization'] = self.normalizer.params()
+            self.manifests.append(FrameManifest(directory, self.input_file, params, self.start, self.hop, self.chunk_size))
+
+    def skip(self, i):
+        """
+        Tells whether an earlier run already rendered frame i from the same
+        samples with the same parameters, as recorded in the frame manifests.
+        Running and rolling scales depend on the frames before, so with them
+        every frame is rendered.
+        """
+        return self.options.normalization in ('frame', 'global') and all(manifest.is_valid(i) for manifest in self.manifests)
+
+    def record(self, i):
+        for manifest in self.manifests:
+            manifest.record(i)
+        self.metrics.count('frames')
+        self.metrics.count('samples', self.hop)
+        self.metrics.maybe_flush()
+
+    def reading(self, items, samples=len):
+        """Times reading items and counts the bytes of their samples(item) samples."""
+        for item in self.metrics.timed(items, 'read'):
+            self.metrics.count('bytes_read', self.read_bytes * samples(item))
+            yield item
+
+    def timed_read(self, read):
+        """Wraps the read function of a lazy chunk so reading it is timed and counted."""
+        def timed():
+            with self.metrics.stage('read'):
+                chunk = read()
+            self.metrics.count('bytes_read', self.read_bytes * len(chunk))
+            return chunk
+        return timed
+
+    def render_spectra(self, transformed):
+        """Renders and records the (i, fft_data) spectra of a pass."""
+        for i, fft_data in self.metrics.timed(transformed, 'fft'):
+            with self.metrics.stage('render'):
+                self.render(i, fft_data)
+            self.record(i)
+
+    def render_live(self):
+        """
+        Reads each chunk once as it lands, and transforms it on its own
+        instead of waiting for a batch, so frames lag the capture by at most
+        about a chunk.
+        """
+        options = self.options
+        if self.stream:
+            source = SocketIngest(self.input_file, self.chunk_size, self.fmt, options.remove_dc, options.buffer_chunks, options.overflow,
+                                  self.start, self.count)
+        else:
+            source = follow_chunks(self.input_file, self.chunk_size, self.fmt, options.remove_dc, self.start, self.count,
+                                   timeout=options.follow_timeout, sentinel=options.follow_sentinel)
+        if options.fps:
+            blocks = self.reading(chunk for _, chunk in source)
+            self.render_spectra(iter_stft(blocks, self.chunk_size, self.hop, options.window, batch_size=1, skip=self.skip))
+        elif options.processes != 1:
+            render_parallel(self.input_file, self.chunk_size, self.render, options.processes or None, self.fmt, options.remove_dc,
+                            skip=self.skip, done=self.record, chunks=source)
+        else:
+            chunks = self.reading(((i, chunk) for i, chunk in source if not self.skip(i)), _chunk_samples)
+            self.render_spectra(iter_spectra(chunks, self.chunk_size, batch_size=1))
+        if self.stream and source.dropped:
+            print(f'Dropped {source.dropped} of {source.received} chunks while rendering fell behind')
+
+    def render_stft(self):
+        """
+        Slides the chunk-long analysis window fps times per second of
+        capture, so consecutive frames overlap instead of each covering its
+        own chunk, and FFTs every window once in batches.
+        """
+        options = self.options
+        blocks = self.reading(iter_blocks(self.input_file, self.chunk_size, self.fmt, options.remove_dc, self.start, self.count))
+        self.render_spectra(iter_stft(blocks, self.chunk_size, self.hop, options.window, skip=self.skip, cache=self.spectra))
+
+    def render_pool(self):
+        """
+        Renders chunks in a process pool, each worker reading its chunk
+        straight from the capture and writing its own frames.
+        """
+        options = self.options
+        render_parallel(self.input_file, self.chunk_size, self.render, options.processes or None, self.fmt, options.remove_dc,
+                        self.start, self.count, skip=self.skip, done=self.record, cache=self.spectra)
+
+    def render_serial(self):
+        """
+        Streams the capture from disk and FFTs it into the frequency domain,
+        a batch of chunks at a time across all cores. Chunks are only read
+        once they are known to be needed: frames that are already rendered
+        are skipped first, then cached spectra are looked up by index.
+        """
+        options = self.options
+        chunks = iter_chunks(self.input_file, self.chunk_size, self.fmt, remove_dc=options.remove_dc, start=self.start, count=self.count,
+                             lazy=True)
+        chunks = ((i, self.timed_read(read)) for i, read in chunks if not self.skip(i))
+        self.render_spectra(iter_spectra(chunks, self.chunk_size, cache=self.spectra))
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import numpy as np
+from urllib.parse import urlsplit
+from iq_reader import FORMATS, sample_size, to_complex
+import render_metrics
+
+# rtl_tcp starts every connection with 'RTL0', the tuner type and the number
+# of gain settings, before the cu8 samples
+RTL_TCP_MAGIC = b'RTL0'
+RTL_TCP_HEADER_SIZE = 12
+
+OVERFLOW_MODES = ('block', 'drop')
+
+
+def is_address(text):
+    """Tells a socket address such as tcp://127.0.0.1:1234 or unix:///tmp/iq.sock from a file path."""
+    return text.startswith(('tcp://', 'unix://'))
+
+
+def parse_address(text):
+    """Returns ('tcp', host, port) or ('unix', path, None) for a socket address."""
+    url = urlsplit(text)
+    if url.scheme == 'tcp' and url.hostname and url.port:
+        return 'tcp', url.hostname, url.port
+    if url.scheme == 'unix' and (url.netloc or url.path):
+        return 'unix', url.netloc + url.path, None
+    raise ValueError(f'Invalid socket address: {text}; use tcp://host:port or unix:///path')
+
+
+async def open_stream(address, limit=1 << 16):
+    """Connects to a socket address and returns its asyncio (reader, writer)."""
+    kind, host, port = parse_address(address)
+    if kind == 'tcp':
+        return await asyncio.open_connection(host, port, limit=limit)
+    return await asyncio.open_unix_connection(host, limit=limit)
+
+
+class SocketIngest:
+    """
+    Reads complete chunks of IQ samples from a TCP or Unix socket, such as a
+    GNU Radio TCP Sink in server mode, rtl_tcp (with fmt='cu8') or
+    iq_replay.py, and yields (index, chunk) like iq_reader.iter_chunks.
+
+    The socket is read by an asyncio event loop in a background thread into
+    a queue of at most buffer_chunks chunks, while the caller renders. When
+    rendering falls behind and the queue is full, overflow decides:
+
+    block: the loop stops reading until there is room, so the kernel socket
+        buffers fill up and TCP flow control blocks the sender. No sample
+        is lost, and the sender has to keep up with the renderer.
+    drop: the newest chunk is dropped and counted, so reading keeps pace
+        with the sender. Frame indices still count the dropped chunks,
+        which leaves gaps in the frame numbers.
+
+    Chunk indices start at the first chunk after start samples. Reading
+    stops after count samples, or when the sender closes the connection,
+    dropping a final partial chunk.
+    """
+
+    def __init__(self, address, chunk_size, fmt='cf32', remove_dc=False, buffer_chunks=4, overflow='block', start=0, count=None):
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f'Unknown overflow mode: {overflow}')
+        parse_address(address)
+        self.address = address
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self.remove_dc = remove_dc
+        self.buffer_chunks = max(1, buffer_chunks)
+        self.overflow = overflow
+        self.start = start
+        self.count = count
+        self.received = 0  # chunks read from the socket
+        self.dropped = 0  # chunks dropped because the queue was full
+        self.metrics = render_metrics.current
+
+    async def _read(self, queue):
+        chunk_bytes = self.chunk_size * sample_size(self.fmt)
+        reader, writer = await open_stream(self.address, limit=chunk_bytes)
+        try:
+            pending = b''
+            if self.fmt == 'cu8':
+                # Strip the rtl_tcp dongle info, which is not samples
+                try:
+                    pending = await reader.readexactly(RTL_TCP_HEADER_SIZE)
+                except asyncio.IncompleteReadError:
+                    return
+                if pending.startswith(RTL_TCP_MAGIC):
+                    pending = b''
+
+            # Samples before the window are read and dropped
+            skip = self.start * sample_size(self.fmt)
+            skipped = min(skip, len(pending))
+            pending = pending[skipped:]
+            skip -= skipped
+            while skip > 0:
+                data = await reader.read(min(skip, chunk_bytes))
+                if not data:
+                    return
+                skip -= len(data)
+
+            i = 0
+            while self.count is None or (i + 1) * self.chunk_size <= self.count:
+                try:
+                    data = pending + await reader.readexactly(chunk_bytes - len(pending))
+                except asyncio.IncompleteReadError:
+                    return
+                pending = b''
+                self.received += 1
+                self.metrics.count('chunks_received')
+                raw = np.frombuffer(data, dtype=FORMATS[self.fmt][0]).reshape((-1, 2))
+                if self.overflow == 'block':
+                    await queue.put((i, raw))
+                elif queue.full():
+                    self.dropped += 1
+                    self.metrics.count('chunks_dropped')
+                else:
+                    queue.put_nowait((i, raw))
+                self.metrics.gauge('ingest_queue', queue.qsize())
+                i += 1
+        finally:
+            writer.close()
+
+    async def _run(self, queue):
+        try:
+            await self._read(queue)
+        except Exception as error:
+            await queue.put(error)
+        # The end of the stream is marked by None
+        await queue.put(None)
+
+    def __iter__(self):
+        loop = asyncio.new_event_loop()
+        queue = None
+
+        async def setup():
+            nonlocal queue
+            queue = asyncio.Queue(self.buffer_chunks)
+            return asyncio.ensure_future(self._run(queue))
+
+        async def stop(task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        task = asyncio.run_coroutine_threadsafe(setup(), loop).result()
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                i, raw = item
+                yield i, to_complex(raw, self.fmt, self.remove_dc)
+        finally:
+            # Stop reading and close the socket, also when the caller stops early
+            asyncio.run_coroutine_threadsafe(stop(task), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
@@ -0,0 +1,193 @@
+import os
+import json
+import stat
+import hashlib
+import numpy as np
+
+# Spectra are shared by every script and render style of the same user
+CACHE_DIR = os.environ.get('SPECTRUM_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'radio_waves', 'spectra'))
+
+
+# The renderers take the log of the PSD plus this floor, to avoid log(0)
+LOG_FLOOR = 1e-6
+
+# An entry with phase; entries without one are plain float32 log-PSD arrays
+PHASE_ENTRY = np.dtype([('log_psd', '<f4'), ('phase', '<f2')])
+
+
+def file_fingerprint(path):
+    """
+    Identifies the contents of a capture by a hash of all of its bytes, so
+    copies and touched files hash the same. Returns None for pipes and
+    FIFOs, whose contents cannot be read twice.
+    """
+    if not stat.S_ISREG(os.stat(path).st_mode):
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def to_entry(spectrum, phase=False):
+    """
+    Packs a spectrum into a cache entry: its float32 log-PSD, as the
+    renderers compute it, and with phase its phase angle in float16.
+    """
+    spectrum = np.asarray(spectrum, dtype=np.complex64)
+    log_psd = np.log(np.abs(spectrum) ** 2 + np.float32(LOG_FLOOR))
+    if not phase:
+        return log_psd
+    entry = np.empty(len(spectrum), dtype=PHASE_ENTRY)
+    entry['log_psd'] = log_psd
+    entry['phase'] = np.angle(spectrum)
+    return entry
+
+
+def from_entry(entry):
+    """
+    Rebuilds a complex64 spectrum from a cache entry. Its log-PSD matches
+    the stored one to float32 rounding; without a stored phase every bin
+    is real.
+    """
+    log_psd = entry['log_psd'] if entry.dtype.names else entry
+    magnitude = np.sqrt(np.maximum(np.exp(log_psd) - np.float32(LOG_FLOOR), 0))
+    spectrum = np.zeros(len(entry), dtype=np.complex64)
+    if entry.dtype.names:
+        phase = entry['phase'].astype(np.float32)
+        spectrum.real = magnitude * np.cos(phase)
+        spectrum.imag = magnitude * np.sin(phase)
+    else:
+        spectrum.real = magnitude
+    return spectrum
+
+
+class SpectrumCache:
+    """
+    Size-bounded on-disk cache of FFT spectra, shared across render styles.
+
+    Entries are content addressed: the file name is a hash of the capture's
+    contents, the chunk's first sample and the FFT parameters, so any
+    script that transforms the same samples the same way finds the same
+    entry, even in a copy of the capture. Only what the renderers use is
+    kept: the float32 log-PSD (4 bytes per bin), plus a float16 phase (6
+    bytes per bin in all) for styles such as RGBA that show it. Spectra are
+    rebuilt from that on a hit, so a cached frame can differ from an
+    uncached one by a rounding level. Hits refresh an entry's modification
+    time, and once the cache exceeds max_bytes the least recently used
+    entries are deleted.
+
+    Hashing a capture reads all of it, so each hash is kept in
+    fingerprints.json next to the entries, under the capture's path, size,
+    modification time and inode, and only recomputed when those change.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=4 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.total = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith('.npy'))
+
+    def fingerprint(self, path):
+        """Returns file_fingerprint(path), hashing the file only if it changed since it was last hashed here."""
+        st = os.stat(path)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        index_path = os.path.join(self.directory, 'fingerprints.json')
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        identity = [st.st_size, st.st_mtime_ns, st.st_ino]
+        known = index.get(os.path.abspath(path))
+        if known is not None and known[:3] == identity:
+            return known[3]
+        fingerprint = file_fingerprint(path)
+        index[os.path.abspath(path)] = identity + [fingerprint]
+        temporary = f'{index_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(index, f)
+        os.replace(temporary, index_path)
+        return fingerprint
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def get(self, key, phase=False):
+        """
+        Returns the spectrum stored under key, or None. With phase, entries
+        stored without one are misses too.
+        """
+        path = self._path(key)
+        try:
+            entry = np.load(path, mmap_mode='r')
+            if entry.dtype not in (np.float32, PHASE_ENTRY) or entry.ndim != 1 or (phase and not entry.dtype.names):
+                return None
+            spectrum = from_entry(entry)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return spectrum
+
+    def put(self, key, spectrum, phase=False):
+        """Stores a spectrum under key, then evicts old entries if the cache is too large."""
+        path = self._path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            np.save(f, to_entry(spectrum, phase))
+        # An entry replaced here, such as one without phase, no longer counts
+        try:
+            self.total -= os.path.getsize(path)
+        except OSError:
+            pass
+        os.replace(temporary, path)
+        self.total += os.path.getsize(path)
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache is back within max_bytes."""
+        entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                         for entry in os.scandir(self.directory) if entry.name.endswith('.npy'))
+        self.total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # removed by a concurrent run
+            self.total -= size
+
+    def bind(self, input_file, first=0, step=1, length=1, phase=False, **params):
+        """
+        Returns a view of the cache for the spectra of one capture, where
+        spectrum i covers samples first + i * step to first + i * step +
+        length, or None if the input cannot be fingerprinted. With phase,
+        spectra keep their phase.
+        """
+        fingerprint = self.fingerprint(input_file)
+        if fingerprint is None:
+            return None
+        return BoundSpectrumCache(self, fingerprint, first, step, length, phase, params)
+
+
+class BoundSpectrumCache:
+    """Looks up and stores the spectra of one capture by frame index."""
+
+    def __init__(self, cache, fingerprint, first, step, length, phase, params):
+        self.cache = cache
+        self.prefix = json.dumps([fingerprint, length, params], sort_keys=True)
+        self.first, self.step = first, step
+        self.phase = phase
+
+    def key(self, i):
+        return hashlib.blake2b(f'{self.prefix}:{self.first + i * self.step}'.encode(), digest_size=20).hexdigest()
+
+    def get(self, i):
+        return self.cache.get(self.key(i), self.phase)
+
+    def put(self, i, spectrum):
+        self.cache.put(self.key(i), spectrum, self.phase)
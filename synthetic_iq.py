@@ -0,0 +1,132 @@
+import os
+import argparse
+import numpy as np
+from iq_reader import FORMATS, from_complex, parse_time
+
+# Sample rate of the generated captures
+input_max = 2.048e6  # Hz
+
+# Kinds of signal that can be generated; mix is the sum of the others
+SIGNALS = ('tones', 'fm', 'bursts', 'noise', 'mix')
+
+# Samples generated per step. Signals are always generated in blocks of this
+# size from the first sample, so a capture only depends on its kind, seed
+# and length, however it is read or written afterwards.
+BLOCK_SIZE = 1 << 16
+
+# Bursts switch on and off in slots of this many samples
+BURST_SLOT = 2048
+
+
+class SyntheticSignal:
+    """
+    Deterministic generator of complex64 IQ test signals.
+
+    tones: a few constant carriers at offsets drawn from the seed.
+    fm: a voice-like FM broadcast, a harmonic-rich tone with a wandering
+        pitch and a syllable-rate envelope, at +/- 75 kHz deviation.
+    bursts: a carrier switched on and off in short slots, hopping frequency
+        from burst to burst.
+    noise: complex white Gaussian noise.
+    mix: all of the above at once, as in a busy band.
+
+    The phase of every oscillator is carried from block to block, so the
+    blocks join without seams. Amplitudes stay below full scale, so the
+    signals survive conversion to the integer sample formats.
+    """
+
+    def __init__(self, kind='mix', sample_rate=input_max, seed=0):
+        if kind not in SIGNALS:
+            raise ValueError(f'Unknown signal: {kind}')
+        self.kind = kind
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng(seed)
+        self.n = 0  # index of the next sample
+
+        # Fixed parameters are drawn first, so every kind sees the same ones
+        self.tone_frequencies = self.rng.uniform(-0.45, 0.45, 4) * sample_rate
+        self.fm_carrier = self.rng.uniform(-0.3, 0.3) * sample_rate
+        self.pitch_phase = 0.0
+        self.fm_phase = 0.0
+        self.burst_frequency = 0.0
+
+    def _time(self, count):
+        return (self.n + np.arange(count)) / self.sample_rate
+
+    def tones(self, t):
+        return sum(0.1 * np.exp(2j * np.pi * f * t) for f in self.tone_frequencies)
+
+    def fm(self, t):
+        # Pitch wanders around 150 Hz, harmonics fall off as 1/k, and the
+        # loudness rises and falls about four times a second like syllables
+        pitch = 150 + 30 * np.sin(2 * np.pi * 0.7 * t)
+        pitch_phase = self.pitch_phase + 2 * np.pi * np.cumsum(pitch) / self.sample_rate
+        self.pitch_phase = pitch_phase[-1] % (2 * np.pi)
+        message = sum(np.sin(k * pitch_phase) / k for k in range(1, 6)) / 2.3
+        message *= 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+
+        # Integrate the instantaneous frequency into the phase
+        frequency = self.fm_carrier + 75e3 * message
+        phase = self.fm_phase + 2 * np.pi * np.cumsum(frequency) / self.sample_rate
+        self.fm_phase = phase[-1] % (2 * np.pi)
+        return 0.3 * np.exp(1j * phase)
+
+    def bursts(self, t):
+        slots = len(t) // BURST_SLOT
+        on = self.rng.random(slots) < 0.2
+        hops = self.rng.uniform(-0.45, 0.45, slots) * self.sample_rate
+        frequencies = np.empty(slots)
+        for slot in range(slots):
+            # A burst keeps its frequency until it ends
+            if on[slot] and (slot == 0 or not on[slot - 1]):
+                self.burst_frequency = hops[slot]
+            frequencies[slot] = self.burst_frequency
+        gate = np.repeat(on, BURST_SLOT)
+        return 0.2 * gate * np.exp(2j * np.pi * np.repeat(frequencies, BURST_SLOT) * t)
+
+    def noise(self, t):
+        return 0.02 * (self.rng.standard_normal(len(t)) + 1j * self.rng.standard_normal(len(t)))
+
+    def next_block(self):
+        """Returns the next BLOCK_SIZE samples as complex64."""
+        t = self._time(BLOCK_SIZE)
+        if self.kind == 'mix':
+            signal = self.tones(t) + self.fm(t) + self.bursts(t) + self.noise(t)
+        else:
+            signal = getattr(self, self.kind)(t)
+        self.n += BLOCK_SIZE
+        return signal.astype(np.complex64)
+
+
+def iter_synthetic(num_samples, kind='mix', sample_rate=input_max, seed=0):
+    """Yields complex64 blocks of a synthetic signal, num_samples in total."""
+    signal = SyntheticSignal(kind, sample_rate, seed)
+    while num_samples > 0:
+        block = signal.next_block()[:num_samples]
+        num_samples -= len(block)
+        yield block
+
+
+def write_capture(path, seconds, kind='mix', fmt='cf32', sample_rate=input_max, seed=0):
+    """Writes seconds of a synthetic signal as a raw capture and returns the number of samples."""
+    num_samples = int(round(seconds * sample_rate))
+    with open(path, 'wb') as f:
+        for block in iter_synthetic(num_samples, kind, sample_rate, seed):
+            f.write(from_complex(block, fmt).tobytes())
+    return num_samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic IQ capture for testing and benchmarks.')
+    parser.add_argument('-o', '--output', default='synthetic.cf32', help='Output capture file.')
+    parser.add_argument('-k', '--kind', default='mix', choices=SIGNALS, help='Kind of signal to generate.')
+    parser.add_argument('-d', '--duration', default='10s', help='Length of the capture, such as 10s or 00:01:00.')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), help='Sample format; guessed from the output extension by default, otherwise cf32.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random parts of the signal.')
+    args = parser.parse_args()
+
+    # The output does not exist yet, so only its extension is looked at
+    extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+    fmt = args.format or (extension if extension in FORMATS else 'cf32')
+    num_samples = write_capture(args.output, parse_time(args.duration), args.kind, fmt, input_max, args.seed)
+    print(f'Wrote {num_samples} {fmt} samples of {args.kind} to {args.output}')
@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root, next to the scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_iq import write_capture  # noqa: E402
+
+# Small frames keep every render in the tests fast
+SAMPLE_RATE = 2.048e6
+CHUNK_SIZE = 128 * 128
+
+
+@pytest.fixture
+def capture(tmp_path, monkeypatch):
+    """Writes a four-chunk synthetic cf32 capture and renders relative to its directory."""
+    path = tmp_path / 'capture.cf32'
+    write_capture(str(path), 4 * CHUNK_SIZE / SAMPLE_RATE, 'mix', 'cf32', SAMPLE_RATE, 0)
+    monkeypatch.chdir(tmp_path)
+    return str(path)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+from fm_demod import StreamingResampler
+
+
+def stream(resampler, signal, rng):
+    """Feeds signal through in chunks of random length, including empty ones."""
+    out = []
+    position = 0
+    while position < len(signal):
+        size = int(rng.integers(0, 3000))
+        out.append(resampler.process(signal[position:position + size]))
+        position += size
+    out.append(resampler.flush())
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize('up, down', [(441, 20480), (3, 7), (5, 2), (1, 1)])
+def test_streaming_matches_one_shot_resample_poly(up, down):
+    rng = np.random.default_rng(up * down)
+    signal = rng.standard_normal(50000)
+    expected = resample_poly(signal, up, down)
+    streamed = stream(StreamingResampler(up, down), signal, rng)
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(streamed, expected, rtol=0, atol=1e-9)
+
+
+def test_chunk_boundaries_do_not_matter():
+    signal = np.random.default_rng(0).standard_normal(20000)
+    runs = [stream(StreamingResampler(441, 2048), signal, np.random.default_rng(seed)) for seed in (1, 2)]
+    np.testing.assert_allclose(runs[0], runs[1], rtol=0, atol=1e-12)
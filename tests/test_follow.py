@@ -0,0 +1,43 @@
+import json
+import argparse
+import pytest
+import freq2light_LOG_PSD
+from render_runner import exit_on_missing_input, render_capture
+from conftest import SAMPLE_RATE, CHUNK_SIZE
+
+STYLES = [(freq2light_LOG_PSD.render_frame, 'frames_LOG_PSD', 'square')]
+
+
+def test_follow_stops_at_the_end_of_a_finished_capture(capture, tmp_path):
+    sentinel = tmp_path / 'done'
+    sentinel.touch()
+    render_capture(capture, STYLES, SAMPLE_RATE, CHUNK_SIZE, follow=True, follow_sentinel=str(sentinel))
+    assert sorted(path.name for path in (tmp_path / 'frames_LOG_PSD').glob('*.png')) == [f'frame_{i:04d}.png' for i in range(4)]
+
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_follow_counts_each_chunk_read_once(capture, tmp_path, processes):
+    sentinel = tmp_path / 'done'
+    sentinel.touch()
+    log = tmp_path / 'metrics.jsonl'
+    render_capture(capture, STYLES, SAMPLE_RATE, CHUNK_SIZE, processes=processes, follow=True, follow_sentinel=str(sentinel),
+                   metrics_log=str(log))
+    counters = json.loads(log.read_text().splitlines()[-1])['counters']
+    assert counters['frames'] == 4
+    assert counters['bytes_read'] == 4 * CHUNK_SIZE * 8
+
+def test_follow_reports_a_capture_that_never_appears(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(FileNotFoundError, match='did not appear within 0.2 s'):
+        render_capture(str(tmp_path / 'missing.cf32'), STYLES, SAMPLE_RATE, CHUNK_SIZE, follow=True, follow_timeout=0.2)
+
+
+def test_scripts_exit_with_a_message_when_the_capture_never_appears(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    parser = argparse.ArgumentParser(prog='render')
+    with pytest.raises(SystemExit) as exit:
+        with exit_on_missing_input(parser):
+            render_capture(str(tmp_path / 'missing.cf32'), STYLES, SAMPLE_RATE, CHUNK_SIZE, follow=True, follow_timeout=0.2)
+    assert exit.value.code == 1
+    assert capsys.readouterr().err == f'render: {tmp_path / "missing.cf32"} did not appear within 0.2 s\n'
@@ -0,0 +1,57 @@
+import os
+from frame_manifest import FrameManifest
+from conftest import CHUNK_SIZE
+
+PARAMS = {'layout': 'square', 'range': (-3.0, 12.0)}
+
+
+def render(directory, capture, params=PARAMS, frames=range(4), contents=b'frame'):
+    """Writes stand-in frames and records them, returning the manifest."""
+    manifest = FrameManifest(directory, capture, params, length=CHUNK_SIZE, step=CHUNK_SIZE)
+    for i in frames:
+        with open(manifest.frame_path(i), 'wb') as f:
+            f.write(contents + bytes([i]))
+        manifest.record(i)
+    return manifest
+
+
+def valid(directory, capture, params=PARAMS):
+    manifest = FrameManifest(directory, capture, params, length=CHUNK_SIZE, step=CHUNK_SIZE)
+    return [i for i in range(4) if manifest.is_valid(i)]
+
+
+def test_recorded_frames_are_valid_on_the_next_run(capture, tmp_path):
+    render(str(tmp_path), capture)
+    assert valid(str(tmp_path), capture) == [0, 1, 2, 3]
+
+
+def test_a_changed_parameter_invalidates_frames(capture, tmp_path):
+    render(str(tmp_path), capture)
+    assert valid(str(tmp_path), capture, dict(PARAMS, range=(-3.0, 13.0))) == []
+    assert valid(str(tmp_path), capture, dict(PARAMS, layout='rect')) == []
+
+
+def test_a_changed_frame_file_invalidates_that_frame(capture, tmp_path):
+    manifest = render(str(tmp_path), capture)
+    with open(manifest.frame_path(2), 'ab') as f:
+        f.write(b'edited')
+    os.remove(manifest.frame_path(3))
+    assert valid(str(tmp_path), capture) == [0, 1]
+
+
+def test_a_changed_capture_invalidates_frames(capture, tmp_path):
+    render(str(tmp_path), capture)
+    with open(capture, 'ab') as f:
+        f.write(b'\0' * 8)
+    assert valid(str(tmp_path), capture) == []
+
+
+def test_a_truncated_line_is_tolerated(capture, tmp_path):
+    manifest = render(str(tmp_path), capture, frames=range(3))
+    # A render killed while appending frame 3 leaves half a line
+    with open(manifest.path, 'a') as f:
+        f.write('{"frame": 3, "input": {"pa')
+    assert valid(str(tmp_path), capture) == [0, 1, 2]
+    # Reading the manifest drops the broken line, and later records stay readable
+    render(str(tmp_path), capture, frames=[3])
+    assert valid(str(tmp_path), capture) == [0, 1, 2, 3]
@@ -0,0 +1,11 @@
+import pytest
+import golden_check
+
+FAST_STYLES = ['LOG_PSD', 'static', 'RGBA', 'Mag_Norm']
+
+
+@pytest.mark.parametrize('float64', [False, True])
+def test_fast_paths_match_the_reference(float64):
+    results = golden_check.run(FAST_STYLES, ['serial', 'stft'], frames=2, chunk_size=256 * 256, float64=float64)
+    assert len(results) == 2 * len(FAST_STYLES)
+    assert all(result['passed'] for result in results), results
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pytest
+import IQ_to_container
+from iq_container import IQContainer
+from iq_reader import guess_format, iter_blocks, iter_chunks, num_chunks, time_window
+from conftest import CHUNK_SIZE
+
+
+def test_time_window_uses_the_rate_stored_in_a_container(capture, tmp_path):
+    container = str(tmp_path / 'capture.iqz')
+    IQ_to_container.main(capture, container, 'cf32', block_seconds=0.01, sample_rate=1e6)
+    assert time_window('1s', '250ms', 2.048e6, container) == (1000000, 250000)
+    # Raw captures carry no rate, so the given one applies
+    assert time_window('1s', '250ms', 2.048e6, capture) == (2048000, 512000)
+    assert time_window(None, None, 2.048e6, container) == (0, None)
+
+
+def test_container_chunks_match_the_raw_capture(capture, tmp_path):
+    container = str(tmp_path / 'capture.iqz')
+    IQ_to_container.main(capture, container, 'cf32', block_seconds=0.01)
+    raw = [chunk.copy() for _, chunk in iter_chunks(capture, CHUNK_SIZE, start=CHUNK_SIZE // 3)]
+    packed = [chunk for _, chunk in iter_chunks(container, CHUNK_SIZE, start=CHUNK_SIZE // 3)]
+    assert len(raw) == len(packed) == 3
+    assert all(np.array_equal(a, b) for a, b in zip(raw, packed))
+
+
+def open_files():
+    return len(os.listdir('/proc/self/fd'))
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc to count open files')
+def test_reading_a_container_leaves_no_file_open(capture, tmp_path):
+    container = str(tmp_path / 'capture.iqz')
+    IQ_to_container.main(capture, container, 'cf32', block_seconds=0.01)
+    before = open_files()
+    for _ in range(3):
+        guess_format(container)
+        time_window('1s', None, 2.048e6, container)
+        num_chunks(container, CHUNK_SIZE)
+        list(iter_chunks(container, CHUNK_SIZE))
+        list(iter_blocks(container, CHUNK_SIZE))
+        with IQContainer(container) as opened:
+            assert len(opened) == 4 * CHUNK_SIZE
+    assert open_files() == before
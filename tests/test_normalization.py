@@ -0,0 +1,28 @@
+import freq2light_LOG_PSD
+from render_runner import render_capture
+from conftest import SAMPLE_RATE, CHUNK_SIZE
+
+rendered = []
+
+
+def counting_render_frame(i, fft_data, normalizer=None):
+    rendered.append(i)
+    freq2light_LOG_PSD.render_frame(i, fft_data, normalizer)
+
+
+def render(capture, **options):
+    rendered.clear()
+    render_capture(capture, [(counting_render_frame, 'frames_LOG_PSD', 'square')], SAMPLE_RATE, CHUNK_SIZE, **options)
+    return list(rendered)
+
+
+def test_global_normalization_resumes(capture):
+    assert render(capture, normalization='global') == [0, 1, 2, 3]
+    assert render(capture, normalization='global') == []
+
+
+def test_global_normalization_with_percentiles_resumes(capture):
+    assert len(render(capture, normalization='global', percentiles=(1, 99))) == 4
+    assert render(capture, normalization='global', percentiles=(1, 99)) == []
+    # A different scale renders every frame again
+    assert len(render(capture, normalization='global', percentiles=(5, 95))) == 4
@@ -0,0 +1,51 @@
+import os
+import pytest
+from parallel_render import render_parallel
+from iq_reader import iter_chunks
+from conftest import CHUNK_SIZE
+
+
+def render_frame(i, fft_data):
+    return i
+
+
+def crashing_render_frame(i, fft_data):
+    # Stands in for a worker killed part way, such as by the OOM killer
+    if i == 2:
+        os._exit(1)
+    return i
+
+
+def test_every_chunk_is_rendered(capture):
+    rendered = []
+    render_parallel(capture, CHUNK_SIZE, render_frame, processes=2, collect=rendered.append)
+    assert sorted(rendered) == [0, 1, 2, 3]
+
+
+def test_a_dead_worker_fails_the_render(capture):
+    with pytest.raises(RuntimeError, match='worker exited'):
+        render_parallel(capture, CHUNK_SIZE, crashing_render_frame, processes=2)
+
+
+def test_a_dead_worker_fails_a_piped_render(capture):
+    chunks = iter_chunks(capture, CHUNK_SIZE)
+    with pytest.raises(RuntimeError, match='worker exited'):
+        render_parallel(capture, CHUNK_SIZE, crashing_render_frame, processes=2, chunks=chunks)
+
+
+def raising_render_frame(i, fft_data):
+    if i == 1:
+        raise ValueError('bad frame')
+    return i
+
+
+def test_a_raising_frame_fails_the_render(capture):
+    with pytest.raises(ValueError, match='bad frame'):
+        render_parallel(capture, CHUNK_SIZE, raising_render_frame, processes=2)
+
+
+def test_a_raising_frame_fails_a_piped_render(capture):
+    # More chunks than ring slots, so the error is seen while chunks are still being read
+    chunks = ((i, chunk.copy()) for i, chunk in iter_chunks(capture, CHUNK_SIZE // 4))
+    with pytest.raises(ValueError, match='bad frame'):
+        render_parallel(capture, CHUNK_SIZE // 4, raising_render_frame, processes=2, chunks=chunks)
@@ -0,0 +1,36 @@
+import numpy as np
+import scipy.sparse
+from point_cloud import PointCloud, _coarsen, _decimate
+
+
+def test_coarsening_a_slice_matches_decimating_the_plane():
+    rng = np.random.default_rng(0)
+    values = rng.random((37, 37)).astype(np.float32)
+    mask = values > 0.7
+    plane, keep = _decimate(values, mask, 2)
+    rows, cols = np.nonzero(keep)
+    points = scipy.sparse.coo_matrix((plane[rows, cols], (rows, cols)), shape=plane.shape)
+
+    expected, expected_keep = _decimate(values, mask, 4)
+    coarse = _coarsen(points)
+    assert coarse.shape == expected.shape
+    assert np.array_equal(coarse.toarray() != 0, expected_keep)
+    assert np.allclose(coarse.toarray()[expected_keep], expected[expected_keep])
+
+
+def test_unknown_length_stays_within_both_limits():
+    rng = np.random.default_rng(1)
+    cloud = PointCloud(5000, max_slices=8)
+    for t in range(100):
+        cloud.add_slice(t, rng.random((64, 64)).astype(np.float32))
+        assert len(cloud) <= 5000 and len(cloud.slices) <= 8
+    # The slices left are evenly spaced
+    assert [t for t, _, _ in cloud.slices] == list(range(0, 100, cloud.stride))
+
+
+def test_known_length_keeps_every_slice():
+    cloud = PointCloud(1000, 4)
+    for t in range(4):
+        assert cloud.takes(t)
+        cloud.add_slice(t, np.ones((32, 32), dtype=np.float32))
+    assert len(cloud.slices) == 4 and len(cloud) <= 1000
@@ -0,0 +1,26 @@
+import argparse
+import pytest
+import freq2light_LOG_PSD
+from render_runner import RenderOptions, add_arguments, render_capture
+from conftest import SAMPLE_RATE, CHUNK_SIZE
+
+STYLES = [(freq2light_LOG_PSD.render_frame, 'frames_LOG_PSD', 'square')]
+
+
+def test_command_line_defaults_match_the_options():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--input')
+    add_arguments(parser)
+    assert RenderOptions.from_args(parser.parse_args([])) == RenderOptions()
+    assert RenderOptions.from_args(parser.parse_args(['-p', '2', '--fps', '30'])) == RenderOptions(processes=2, fps=30)
+
+
+def test_unknown_option_is_rejected(capture):
+    with pytest.raises(TypeError):
+        render_capture(capture, STYLES, SAMPLE_RATE, CHUNK_SIZE, procesess=2)
+
+
+@pytest.mark.parametrize('options', [{}, {'processes': 2}, {'fps': SAMPLE_RATE / CHUNK_SIZE}, {'normalization': 'global', 'processes': 2}])
+def test_every_pass_renders_every_frame(capture, tmp_path, options):
+    render_capture(capture, STYLES, SAMPLE_RATE, CHUNK_SIZE, RenderOptions(**options))
+    assert len(list((tmp_path / 'frames_LOG_PSD').glob('*.png'))) == 4
@@ -0,0 +1,68 @@
+import socket
+import asyncio
+import threading
+import time
+import pytest
+import freq2light_LOG_PSD
+import render_metrics
+from iq_replay import Replay
+from render_runner import render_capture
+from socket_ingest import SocketIngest
+from conftest import SAMPLE_RATE, CHUNK_SIZE
+
+STYLES = [(freq2light_LOG_PSD.render_frame, 'frames_LOG_PSD', 'square')]
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def address(request, tmp_path):
+    if request.param == 'unix':
+        return f'unix://{tmp_path}/iq.sock'
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f'tcp://127.0.0.1:{s.getsockname()[1]}'
+
+
+def replay(capture, address, rate=0):
+    """Serves a capture over loopback in a background thread until its first client is done."""
+    server = Replay(capture, rate)
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(address),), daemon=True)
+    thread.start()
+    assert server.listening.wait(5)
+    return server, thread
+
+
+def test_block_mode_renders_every_frame(capture, address, tmp_path):
+    server, thread = replay(capture, address)
+    render_capture(address, STYLES, SAMPLE_RATE, CHUNK_SIZE, buffer_chunks=1)
+    thread.join(5)
+    assert server.sent == 4 * CHUNK_SIZE * 8
+    assert len(list((tmp_path / 'frames_LOG_PSD').glob('*.png'))) == 4
+
+
+def test_block_mode_keeps_every_chunk_for_a_slow_reader(capture, address):
+    replay(capture, address, rate=4 * SAMPLE_RATE)
+    ingest = SocketIngest(address, CHUNK_SIZE, buffer_chunks=1, overflow='block')
+    indices = []
+    for i, chunk in ingest:
+        time.sleep(0.1)
+        indices.append(i)
+    assert indices == [0, 1, 2, 3]
+    assert ingest.received == 4 and ingest.dropped == 0
+
+
+def test_drop_mode_counts_dropped_chunks(capture, address, monkeypatch):
+    metrics = render_metrics.RenderMetrics()
+    monkeypatch.setattr(render_metrics, 'current', metrics)
+    replay(capture, address)
+    ingest = SocketIngest(address, CHUNK_SIZE, buffer_chunks=1, overflow='drop')
+    indices = []
+    for i, chunk in ingest:
+        # Fall behind while the rest of the capture arrives
+        if not indices:
+            time.sleep(0.5)
+        indices.append(i)
+    assert ingest.received == 4
+    assert ingest.dropped >= 1 and len(indices) + ingest.dropped == 4
+    assert indices == sorted(set(indices)) and indices[0] == 0
+    counters = metrics.snapshot()['counters']
+    assert counters['chunks_received'] == 4 and counters['chunks_dropped'] == ingest.dropped
@@ -0,0 +1,140 @@
+import os
+import shutil
+import numpy as np
+import spectrum_cache
+from spectrum_cache import SpectrumCache
+from fft_engine import iter_spectra
+from iq_reader import iter_chunks
+from conftest import CHUNK_SIZE
+
+
+def spectrum(seed=0, size=1024):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(size) + 1j * rng.standard_normal(size)).astype(np.complex64) * 100
+
+
+def log_psd(fft_data):
+    return np.log(np.abs(fft_data) ** 2 + 1e-6)
+
+
+def test_hits_keep_the_log_psd_and_only_requested_phase(tmp_path):
+    cache = SpectrumCache(str(tmp_path))
+    original = spectrum()
+    cache.put('magnitude', original)
+    cache.put('phase', original, phase=True)
+
+    magnitude = cache.get('magnitude')
+    np.testing.assert_allclose(log_psd(magnitude), log_psd(original), rtol=1e-5)
+    assert not np.any(magnitude.imag)
+    with_phase = cache.get('phase', phase=True)
+    np.testing.assert_allclose(np.abs(with_phase), np.abs(original), rtol=1e-5)
+    # float16 keeps the phase to about a thousandth of a radian
+    assert np.max(np.abs(np.angle(with_phase * np.conj(original)))) < 2e-3
+
+    # An entry without phase cannot serve a style that shows it, but one with phase serves any style
+    assert cache.get('magnitude', phase=True) is None
+    np.testing.assert_allclose(log_psd(cache.get('phase')), log_psd(original), rtol=1e-5)
+    assert cache.get('missing') is None
+
+
+def test_entries_are_compact(tmp_path):
+    cache = SpectrumCache(str(tmp_path))
+    cache.put('magnitude', spectrum(size=4096))
+    cache.put('phase', spectrum(size=4096), phase=True)
+    assert os.path.getsize(cache._path('magnitude')) <= 4096 * 4 + 128
+    assert os.path.getsize(cache._path('phase')) <= 4096 * 6 + 128
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = 1024 * 4 + 128  # float32 log-PSD plus the .npy header
+    cache = SpectrumCache(str(tmp_path), max_bytes=int(2.5 * entry_size))
+    cache.put('a', spectrum(1))
+    cache.put('b', spectrum(2))
+    # Make b older than a, which is then used again
+    os.utime(cache._path('a'), ns=(2, 2))
+    os.utime(cache._path('b'), ns=(1, 1))
+    cache.get('a')
+    cache.put('c', spectrum(3))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.total <= cache.max_bytes
+
+
+def test_replacing_an_entry_does_not_count_it_twice(tmp_path):
+    cache = SpectrumCache(str(tmp_path))
+    cache.put('a', spectrum())
+    cache.put('a', spectrum())
+    cache.put('a', spectrum(), phase=True)
+    assert cache.total == os.path.getsize(cache._path('a'))
+
+
+def test_corrupt_entries_are_misses(tmp_path):
+    cache = SpectrumCache(str(tmp_path))
+    cache.put('truncated', spectrum(1))
+    with open(cache._path('truncated'), 'r+b') as f:
+        f.truncate(200)
+    with open(cache._path('garbage'), 'wb') as f:
+        f.write(b'not a spectrum')
+    np.save(cache._path('wrong'), np.zeros(16, dtype=np.int64))
+    assert cache.get('truncated') is None
+    assert cache.get('garbage') is None
+    assert cache.get('wrong') is None
+    # A new spectrum replaces the corrupt entry
+    cache.put('truncated', spectrum(2))
+    np.testing.assert_allclose(log_psd(cache.get('truncated')), log_psd(spectrum(2)), rtol=1e-5)
+
+
+def test_keys_change_with_the_capture_window_and_parameters(capture, tmp_path):
+    cache = SpectrumCache(str(tmp_path / 'cache'))
+    bound = cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE, fmt='cf32', remove_dc=False)
+    keys = {bound.key(0), bound.key(1),
+            cache.bind(capture, CHUNK_SIZE // 2, CHUNK_SIZE, CHUNK_SIZE, fmt='cf32', remove_dc=False).key(0),
+            cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE, fmt='cf32', remove_dc=True).key(0),
+            cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE // 2, fmt='cf32', remove_dc=False).key(0)}
+    assert len(keys) == 5
+    assert cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE, fmt='cf32', remove_dc=False).key(1) == bound.key(1)
+
+    # Rewriting the capture invalidates its spectra
+    bound.put(0, spectrum(size=CHUNK_SIZE))
+    with open(capture, 'r+b') as f:
+        f.write(b'\0' * 8)
+    assert cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE, fmt='cf32', remove_dc=False).get(0) is None
+
+
+def test_copied_and_touched_captures_share_entries(capture, tmp_path):
+    cache = SpectrumCache(str(tmp_path / 'cache'))
+    cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE).put(0, spectrum(size=CHUNK_SIZE))
+    copy = str(tmp_path / 'copy.cf32')
+    shutil.copy(capture, copy)
+    os.utime(capture, ns=(0, 0))
+    assert cache.bind(copy, 0, CHUNK_SIZE, CHUNK_SIZE).get(0) is not None
+    assert cache.bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE).get(0) is not None
+
+
+def test_unchanged_captures_are_hashed_once(capture, tmp_path, monkeypatch):
+    hashed = []
+    fingerprint = spectrum_cache.file_fingerprint
+    monkeypatch.setattr(spectrum_cache, 'file_fingerprint', lambda path: hashed.append(path) or fingerprint(path))
+    for _ in range(2):
+        SpectrumCache(str(tmp_path / 'cache')).bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE)
+    assert hashed == [capture]
+    os.utime(capture, ns=(0, 0))
+    SpectrumCache(str(tmp_path / 'cache')).bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE)
+    assert hashed == [capture, capture]
+
+
+def test_cached_chunks_are_not_read(capture, tmp_path):
+    bound = SpectrumCache(str(tmp_path / 'cache')).bind(capture, 0, CHUNK_SIZE, CHUNK_SIZE)
+    expected = [log_psd(fft_data) for _, fft_data in iter_spectra(iter_chunks(capture, CHUNK_SIZE, lazy=True), CHUNK_SIZE, cache=bound)]
+
+    read = []
+
+    def chunks():
+        for i, chunk in iter_chunks(capture, CHUNK_SIZE, lazy=True):
+            yield i, lambda i=i, chunk=chunk: read.append(i) or chunk()
+
+    spectra = [(i, log_psd(fft_data)) for i, fft_data in iter_spectra(chunks(), CHUNK_SIZE, cache=bound)]
+    assert read == []
+    assert [i for i, _ in spectra] == [0, 1, 2, 3]
+    for i, cached in spectra:
+        np.testing.assert_allclose(cached, expected[i], rtol=1e-5, atol=1e-5)